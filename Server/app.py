@@ -7,6 +7,7 @@ import os
 from routes import routes  # blueprint
 from config.mailConfig import mail
 from config.supabaseConfig import SECRET_KEY
+from utils.snapshotWorker import start_snapshot_worker
 
 # Load env
 load_dotenv()
@@ -17,6 +18,8 @@ WEB_URL3 = os.getenv("WEB_URL3")
 
 app = Flask(__name__)
 app.config["SECRET_KEY"] = SECRET_KEY
+# Reject oversized request bodies with 413 before they are parsed (batch uploads are capped at 50 MB)
+app.config["MAX_CONTENT_LENGTH"] = int(os.getenv("MAX_CONTENT_LENGTH", str(52 * 1024 * 1024)))
 
 # 🔥 CORS — solid config
 CORS(
@@ -41,6 +44,12 @@ def handle_preflight():
     if flask.request.method == "OPTIONS":
         return "", 200
 
+# Start background analytics snapshots in the process that actually serves requests
+# (not the debug reloader's watcher); start_snapshot_worker() is a no-op after the first call
+@app.before_request
+def start_background_jobs():
+    start_snapshot_worker()
+
 # Init mail
 mail.init_app(app)
 
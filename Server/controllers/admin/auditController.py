@@ -0,0 +1,40 @@
+from flask import request, jsonify
+from middleware.authToken import verify_admin_token
+from utils.auditLog import query_audit_log
+from utils.queryHelpers import encode_cursor, read_page_params
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def view_audit_log():
+    """View admin actions, newest first, one page at a time."""
+    try:
+        data = request.get_json()
+        auth_token = data.get("auth_token")
+        if not auth_token:
+            return jsonify({"error": "auth_token is required"}), 400
+
+        try:
+            page_size, cursor = read_page_params(data, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        username = verify_admin_token(auth_token)
+        if not username:
+            return jsonify({"error": "Invalid auth_token"}), 401
+
+        entries, has_more = query_audit_log(
+            admin=data.get("admin"), action=data.get("action"), target_id=data.get("target_id"),
+            cursor=cursor, limit=page_size
+        )
+
+        return jsonify({
+            "entries": entries,
+            "page_size": page_size,
+            "next_cursor": encode_cursor(entries[-1]) if has_more else None,
+            "has_more": has_more
+        }), 200
+
+    except Exception as e:
+        print(f"View audit log error: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
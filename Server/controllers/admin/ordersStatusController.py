@@ -1,28 +1,71 @@
 from flask import request, jsonify
 from config.supabaseConfig import supabase
 from middleware.authToken import verify_admin_token
-from datetime import datetime
+from datetime import datetime, timezone
+from utils.orderEvents import publish_order_status_changed
+from utils.auditLog import record_admin_action
+from utils.rollups import snapshot_orders, record_status_change, load_platform_rollups, rebuild_platform_rollups, RECONCILE_INTERVAL
+from utils.timeSeries import parse_series_params, build_series, rollups_cover, rollup_series
+from utils.bestsellers import top_products
+from utils.queryHelpers import select_in_chunks, select_all, read_page_params, fetch_page
+from utils.dashboardAggregator import group_items_by_order
+from utils.snapshotWorker import register_snapshot, register_job, snapshot_or_compute, wants_fresh
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
 
 def view_all_orders():
-    """View all orders."""
+    """View one page of platform orders, newest first, with optional filters."""
     try:
         data = request.get_json()
         auth_token = data.get("auth_token")
+        status_filter = data.get("status")
+        date_from = data.get("date_from")
+        date_to = data.get("date_to")
+        retailer_email = data.get("retailer_email")
+        city = data.get("city")
         if not auth_token:
             return jsonify({"error": "auth_token is required"}), 400
 
+        try:
+            page_size, cursor = read_page_params(data, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
         username = verify_admin_token(auth_token)
         if not username:
             return jsonify({"error": "Invalid auth_token"}), 401
 
-        orders_response = supabase.table("orders").select("*").order("created_at", desc=True).execute()
-        orders = orders_response.data
-
+        if retailer_email:
+            # Inner embed keeps only orders with at least one item from this retailer
+            query = supabase.table("orders").select("*, order_items!inner(order_id)").eq("order_items.retailer_email", retailer_email)
+        else:
+            query = supabase.table("orders").select("*")
+
+        if status_filter:
+            query = query.eq("delivery_status", status_filter)
+        if date_from:
+            query = query.gte("created_at", date_from)
+        if date_to:
+            query = query.lte("created_at", date_to)
+        if city:
+            query = query.eq("city", city)
+
+        orders, next_cursor = fetch_page(query, cursor, page_size)
+
+        # Items for the whole page in one batched query
+        items = select_in_chunks(lambda: supabase.table("order_items").select("*"), "order_id", [o["id"] for o in orders])
+        items_by_order = group_items_by_order(items)
         for order in orders:
-            items_response = supabase.table("order_items").select("*").eq("order_id", order["id"]).execute()
-            order["items"] = items_response.data
+            order.pop("order_items", None)
+            order["items"] = items_by_order.get(order["id"], [])
 
-        return jsonify({"orders": orders}), 200
+        return jsonify({
+            "orders": orders,
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        }), 200
 
     except Exception as e:
         print(f"View all orders error: {str(e)}")
@@ -42,7 +85,14 @@ def edit_order_status():
         if not username:
             return jsonify({"error": "Invalid auth_token"}), 401
 
-        supabase.table("orders").update({"delivery_status": status}).eq("id", order_id).execute()
+        snapshot = snapshot_orders([order_id])
+        update_response = supabase.table("orders").update({"delivery_status": status}).eq("id", order_id).execute()
+        record_status_change(snapshot, status)
+        publish_order_status_changed(update_response.data, status)
+        record_admin_action(username, "edit_order_status", "order", [order_id], {
+            "from_status": snapshot[0][0].get("delivery_status") if snapshot else None,
+            "status": status
+        })
 
         return jsonify({"message": f"Order status updated to {status}"}), 200
 
@@ -62,36 +112,100 @@ def admin_dashboard():
         if not username:
             return jsonify({"error": "Invalid auth_token"}), 401
 
-        # Get all orders
-        orders_response = supabase.table("orders").select("id, delivery_status, created_at, total_amount").execute()
-        orders = orders_response.data
+        dashboard, computed_at = snapshot_or_compute("admin-dashboard", fresh=wants_fresh(data))
 
-        total_orders = len(orders)
-        total_returned = sum(1 for o in orders if o["delivery_status"] == "returned")
-        delivered_revenue = sum(o["total_amount"] for o in orders if o["delivery_status"] == "delivered")
-        returned_revenue = sum(o["total_amount"] for o in orders if o["delivery_status"] == "returned")
-        total_revenue = delivered_revenue - returned_revenue
+        return jsonify({**dashboard, "computed_at": datetime.fromtimestamp(computed_at, timezone.utc).isoformat()}), 200
 
-        # Monthly orders
-        monthly = {}
-        for order in orders:
-            created_at = order["created_at"]
-            if isinstance(created_at, str):
-                date = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-            else:
-                date = created_at
-            month = date.strftime("%Y-%m")
-            monthly[month] = monthly.get(month, 0) + 1
+    except Exception as e:
+        print(f"Admin dashboard error: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+def compute_admin_dashboard():
+    """Platform-wide order totals, monthly order counts and bestsellers."""
+    # Counters are kept per month and status, so this reads a few rows per month
+    # instead of every order
+    counters = load_platform_rollups()
+
+    total_orders = sum(row["orders"] for row in counters)
+    total_returned = sum(row["orders"] for row in counters if row["status"] == "returned")
+    delivered_revenue = sum(row["amount"] for row in counters if row["status"] == "delivered")
+    returned_revenue = sum(row["amount"] for row in counters if row["status"] == "returned")
+    total_revenue = delivered_revenue - returned_revenue
+
+    # Monthly orders
+    monthly = {}
+    for row in counters:
+        monthly[row["month"]] = monthly.get(row["month"], 0) + row["orders"]
+
+    monthly_orders = [{"month": k, "count": v} for k, v in sorted(monthly.items()) if v > 0]
+
+    return {
+        "total_orders": total_orders,
+        "total_returned": total_returned,
+        "total_revenue": round(total_revenue, 2),
+        "monthly_orders": monthly_orders,
+        "top_selling_products": platform_top_products()
+    }
+
+register_snapshot("admin-dashboard", compute_admin_dashboard, per_retailer=False)
+register_job("platform-rollups", rebuild_platform_rollups, RECONCILE_INTERVAL)
+
+def platform_top_products(limit=10):
+    """Platform-wide bestsellers from the streaming tracker, with product details."""
+    try:
+        ranked = top_products(k=limit * 2)
+        if not ranked:
+            return []
+        products_response = supabase.table("products").select("id, title, category, retailer_email").in_("id", [product_id for product_id, _ in ranked]).execute()
+        product_map = {p["id"]: p for p in products_response.data}
+        return [
+            {
+                "id": product_id,
+                "title": product_map[product_id].get("title"),
+                "category": product_map[product_id].get("category"),
+                "retailer_email": product_map[product_id].get("retailer_email"),
+                "quantity_sold": sales["quantity"],
+                "revenue": round(sales["revenue"], 2)
+            }
+            for product_id, sales in ranked if product_id in product_map
+        ][:limit]
+    except Exception as e:
+        print(f"Warning: Could not load platform bestsellers: {str(e)}")
+        return []
+
+def admin_revenue_series():
+    """Get platform-wide order counts and revenue bucketed by hour, day, week or month."""
+    try:
+        data = request.get_json()
+        auth_token = data.get("auth_token")
+        status = data.get("status", "delivered")
+        if not auth_token:
+            return jsonify({"error": "auth_token is required"}), 400
+
+        try:
+            params = parse_series_params(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        monthly_orders = [{"month": k, "count": v} for k, v in sorted(monthly.items())]
+        username = verify_admin_token(auth_token)
+        if not username:
+            return jsonify({"error": "Invalid auth_token"}), 401
+
+        series_status = None if status == "all" else status
+        if rollups_cover(params, "month"):
+            # Whole UTC months: a few counter rows instead of every order
+            series = rollup_series(load_platform_rollups(), params, "month", "amount", series_status)
+        else:
+            orders = select_all(lambda: supabase.table("orders").select("id, delivery_status, created_at, total_amount").gte("created_at", params["start"].isoformat()).lte("created_at", params["end"].isoformat()))
+            series = build_series(orders, None, params, series_status)
 
         return jsonify({
-            "total_orders": total_orders,
-            "total_returned": total_returned,
-            "total_revenue": total_revenue,
-            "monthly_orders": monthly_orders
+            "granularity": params["granularity"],
+            "timezone": str(params["tz"]),
+            "status": status,
+            "series": series
         }), 200
 
     except Exception as e:
-        print(f"Admin dashboard error: {str(e)}")
-        return jsonify({"error": "Internal server error"}), 500
\ No newline at end of file
+        print(f"Admin revenue series error: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
@@ -1,6 +1,13 @@
+from collections import defaultdict
 from flask import request, jsonify
 from config.supabaseConfig import supabase
 from middleware.authToken import verify_admin_token
+from utils.productEvents import publish_products_changed
+from utils.auditLog import record_admin_action
+from utils.queryHelpers import select_in_chunks, chunked
+from utils.retailerProfiles import get_retailer_profiles, fallback_profile
+
+MAX_BULK_PRODUCTS = 500
 
 def view_pending_products():
     """View all pending products."""
@@ -21,27 +28,8 @@ def view_pending_products():
         products_response = supabase.table("products").select("*").eq("status", "pending").order("created_at", desc=True).execute()
         products = products_response.data
 
-        # Add retailer info and images for each product
-        for product in products:
-            # Try to get retailer info using correct table name "retailer"
-            try:
-                retailer_response = supabase.table("retailer").select("full_name, email").eq("email", product["retailer_email"]).execute()
-                if retailer_response.data:
-                    product["retailer"] = retailer_response.data[0]
-                else:
-                    product["retailer"] = {"full_name": product.get("retailer_email", "Unknown"), "email": product.get("retailer_email", "")}
-            except Exception as retailer_error:
-                # Table doesn't exist or other error - use email as fallback
-                print(f"Warning: Could not fetch retailer info: {str(retailer_error)}")
-                product["retailer"] = {"full_name": product.get("retailer_email", "Unknown"), "email": product.get("retailer_email", "")}
-            
-            # Get product images
-            try:
-                images_response = supabase.table("product_images").select("*").eq("product_id", product["id"]).execute()
-                product["images"] = images_response.data if images_response.data else []
-            except Exception as img_error:
-                print(f"Warning: Could not fetch product images: {str(img_error)}")
-                product["images"] = []
+        # Add retailer info and images for the whole list in two batched queries
+        attach_moderation_details(products, include_images=True)
 
         return jsonify({"products": products, "success": True}), 200
 
@@ -68,16 +56,7 @@ def view_approved_products():
         products_response = supabase.table("products").select("*").eq("status", "approved").order("created_at", desc=True).execute()
         products = products_response.data
 
-        for product in products:
-            try:
-                retailer_response = supabase.table("retailer").select("full_name, email").eq("email", product["retailer_email"]).execute()
-                if retailer_response.data:
-                    product["retailer"] = retailer_response.data[0]
-                else:
-                    product["retailer"] = {"full_name": product.get("retailer_email", "Unknown"), "email": product.get("retailer_email", "")}
-            except Exception as retailer_error:
-                print(f"Warning: Could not fetch retailer info: {str(retailer_error)}")
-                product["retailer"] = {"full_name": product.get("retailer_email", "Unknown"), "email": product.get("retailer_email", "")}
+        attach_moderation_details(products)
 
         return jsonify({"products": products, "success": True}), 200
 
@@ -104,16 +83,7 @@ def view_rejected_products():
         products_response = supabase.table("products").select("*").eq("status", "rejected").order("created_at", desc=True).execute()
         products = products_response.data
 
-        for product in products:
-            try:
-                retailer_response = supabase.table("retailer").select("full_name, email").eq("email", product["retailer_email"]).execute()
-                if retailer_response.data:
-                    product["retailer"] = retailer_response.data[0]
-                else:
-                    product["retailer"] = {"full_name": product.get("retailer_email", "Unknown"), "email": product.get("retailer_email", "")}
-            except Exception as retailer_error:
-                print(f"Warning: Could not fetch retailer info: {str(retailer_error)}")
-                product["retailer"] = {"full_name": product.get("retailer_email", "Unknown"), "email": product.get("retailer_email", "")}
+        attach_moderation_details(products)
 
         return jsonify({"products": products, "success": True}), 200
 
@@ -121,6 +91,24 @@ def view_rejected_products():
         print(f"View rejected products error: {str(e)}")
         return jsonify({"error": "Internal server error", "message": str(e)}), 500
 
+def attach_moderation_details(products, include_images=False):
+    """Attach each product's retailer profile (and optionally its images) in place."""
+    profiles = get_retailer_profiles(p.get("retailer_email") for p in products)
+    for product in products:
+        product["retailer"] = profiles.get(product.get("retailer_email")) or fallback_profile(product.get("retailer_email"))
+
+    if include_images:
+        try:
+            images = select_in_chunks(lambda: supabase.table("product_images").select("*"), "product_id", [p["id"] for p in products])
+        except Exception as img_error:
+            print(f"Warning: Could not fetch product images: {str(img_error)}")
+            images = []
+        images_by_product = defaultdict(list)
+        for image in images:
+            images_by_product[image["product_id"]].append(image)
+        for product in products:
+            product["images"] = images_by_product.get(product["id"], [])
+
 def edit_product_status():
     """Edit product status to approved or rejected."""
     try:
@@ -141,10 +129,101 @@ def edit_product_status():
             return jsonify({"error": "Database connection not available. Please check Supabase configuration."}), 500
 
         update_data = {"status": status, "admin_comment": admin_comment}
-        supabase.table("products").update(update_data).eq("id", product_id).execute()
+        update_response = supabase.table("products").update(update_data).eq("id", product_id).execute()
+        publish_products_changed(update_response.data, status)
+        record_admin_action(username, "edit_product_status", "product", [product_id], {"status": status, "admin_comment": admin_comment})
 
         return jsonify({"message": f"Product status updated to {status}", "success": True, "product_id": product_id, "new_status": status}), 200
 
     except Exception as e:
         print(f"Edit product status error: {str(e)}")
         return jsonify({"error": "Internal server error", "message": str(e)}), 500
+
+def _is_product_id(value):
+    # bool is an int subclass, but True is never a product id
+    return isinstance(value, (str, int)) and not isinstance(value, bool) and value != ""
+
+def _is_comment(value):
+    return value is None or isinstance(value, str)
+
+def _read_bulk_moderation(data):
+    """Return {product_id: admin_comment} from a bulk moderation request, or an error message.
+
+    Accepts products=[{"product_id", "admin_comment"}] for per-item comments and/or
+    product_ids=[...] sharing admin_comment.
+    """
+    shared_comment = data.get("admin_comment", "")
+    items = data.get("products") or []
+    product_ids = data.get("product_ids") or []
+    if not isinstance(items, list) or not isinstance(product_ids, list) or not (items or product_ids):
+        return None, "products or product_ids must be a non-empty list"
+    if not _is_comment(shared_comment):
+        return None, "admin_comment must be a string"
+
+    comments = {}
+    for product_id in product_ids:
+        if not _is_product_id(product_id):
+            return None, "each entry in product_ids must be a product id"
+        comments.setdefault(product_id, shared_comment)
+    for item in items:
+        if not isinstance(item, dict) or not _is_product_id(item.get("product_id")):
+            return None, "each entry in products needs a product_id"
+        if not _is_comment(item.get("admin_comment")):
+            return None, "admin_comment must be a string"
+        comments[item["product_id"]] = item.get("admin_comment", shared_comment)
+
+    if len(comments) > MAX_BULK_PRODUCTS:
+        return None, f"At most {MAX_BULK_PRODUCTS} products can be moderated at once"
+    return comments, None
+
+def bulk_edit_product_status():
+    """Approve or reject several products in one request, with optional per-product comments."""
+    try:
+        data = request.get_json()
+        auth_token = data.get("auth_token")
+        status = data.get("status")  # 'approved' or 'rejected'
+        if not auth_token or status not in ["approved", "rejected"]:
+            return jsonify({"error": "auth_token, products or product_ids, and valid status (approved/rejected) are required"}), 400
+
+        comments, error = _read_bulk_moderation(data)
+        if error:
+            return jsonify({"error": error}), 400
+
+        username = verify_admin_token(auth_token)
+        if not username:
+            return jsonify({"error": "Invalid auth_token"}), 401
+
+        # Check if Supabase is connected
+        if supabase is None:
+            return jsonify({"error": "Database connection not available. Please check Supabase configuration."}), 500
+
+        # Products sharing a comment are updated together with one in_() per chunk
+        ids_by_comment = defaultdict(list)
+        for product_id, admin_comment in comments.items():
+            ids_by_comment[admin_comment].append(product_id)
+
+        updated_products = []
+        for admin_comment, product_ids in ids_by_comment.items():
+            for chunk in chunked(product_ids):
+                update_response = supabase.table("products").update({"status": status, "admin_comment": admin_comment}).in_("id", chunk).execute()
+                updated_products.extend(update_response.data)
+
+        # One notification per retailer for the whole batch refreshes their cached analytics once
+        publish_products_changed(updated_products, status)
+
+        updated_ids = {p["id"] for p in updated_products}
+        record_admin_action(username, "bulk_edit_product_status", "product", [product_id for product_id in comments if product_id in updated_ids], {
+            "status": status,
+            "admin_comments": {product_id: comments[product_id] for product_id in comments if product_id in updated_ids}
+        })
+        return jsonify({
+            "message": f"{len(updated_ids)} product(s) updated to {status}",
+            "success": True,
+            "new_status": status,
+            "updated": [product_id for product_id in comments if product_id in updated_ids],
+            "not_found": [product_id for product_id in comments if product_id not in updated_ids]
+        }), 200
+
+    except Exception as e:
+        print(f"Bulk edit product status error: {str(e)}")
+        return jsonify({"error": "Internal server error", "message": str(e)}), 500
@@ -1,8 +1,40 @@
+import heapq
 from flask import request, jsonify
 from config.supabaseConfig import supabase
 from middleware.authToken import verify_retailer_token
-from datetime import datetime, timedelta
-from collections import defaultdict
+from datetime import datetime, timezone
+from utils.queryHelpers import select_in_chunks, select_all, read_page_params, fetch_page
+from utils.responseCache import dashboard_cache
+from utils.snapshotWorker import register_snapshot, register_job, snapshot_or_compute, wants_fresh
+from utils.timeSeries import parse_series_params, build_series, rollups_cover, rollup_series
+from utils.rollups import load_retailer_rollups, load_product_rollups, reconcile_retailer_rollups, RECONCILE_INTERVAL
+from utils.bestsellers import top_products
+from utils.analyticsEngine import OrderFrame, product_analytics
+from utils.dashboardAggregator import (
+    DashboardAggregate, PENDING_STATUSES, aggregate_dashboard, group_items_by_order,
+    monthly_revenue_series, revenue_window
+)
+
+TOP_PRODUCTS_LIMIT = 5
+LOW_STOCK_THRESHOLD = 10
+DEFAULT_PRODUCT_PAGE_SIZE = 50
+MAX_PRODUCT_PAGE_SIZE = 200
+STOCK_BANDS = ("in_stock", "low_stock", "out_of_stock")
+PRODUCT_STATUSES = ("pending", "approved", "rejected")
+
+EMPTY_DASHBOARD_STATS = {
+    "total_orders": 0,
+    "pending_orders": 0,
+    "confirmed_orders": 0,
+    "rejected_orders": 0,
+    "delivered_orders": 0,
+    "total_revenue": 0,
+    "total_products": 0,
+    "low_stock_products": 0,
+    "monthly_revenue": [],
+    "top_selling_products": [],
+    "recent_orders": []
+}
 
 def get_advanced_dashboard_stats():
     """Get comprehensive dashboard statistics for the retailer."""
@@ -16,145 +48,118 @@ def get_advanced_dashboard_stats():
         if not retailer_email:
             return jsonify({"error": "Invalid auth_token"}), 401
 
-        # Get all order items for this retailer
-        order_items_response = supabase.table("order_items").select("*").eq("retailer_email", retailer_email).execute()
-        order_items = order_items_response.data
-        
-        if not order_items:
-            return jsonify({
-                "total_orders": 0,
-                "pending_orders": 0,
-                "confirmed_orders": 0,
-                "rejected_orders": 0,
-                "delivered_orders": 0,
-                "total_revenue": 0,
-                "total_products": 0,
-                "low_stock_products": 0,
-                "monthly_revenue": [],
-                "top_selling_products": [],
-                "recent_orders": []
-            }), 200
-
-        # Get unique order IDs
-        order_ids = list(set([item["order_id"] for item in order_items]))
-        
-        # Get all orders for this retailer
-        orders_response = supabase.table("orders").select("*").in_("id", order_ids).execute()
-        orders = orders_response.data
-
-        # Get all products for this retailer
-        products_response = supabase.table("products").select("*").eq("retailer_email", retailer_email).execute()
-        products = products_response.data
-
-        # Calculate statistics
-        total_orders = len(orders)
-        pending_orders = sum(1 for o in orders if o.get("delivery_status", "").lower() in ["pending", "processing", "confirmed"])
-        confirmed_orders = sum(1 for o in orders if o.get("delivery_status", "").lower() == "confirmed")
-        rejected_orders = sum(1 for o in orders if o.get("delivery_status", "").lower() == "rejected")
-        delivered_orders = sum(1 for o in orders if o.get("delivery_status", "").lower() == "delivered")
-
-        # Calculate revenue
-        order_revenues = {}
-        for item in order_items:
-            order_id = item["order_id"]
-            order_revenues[order_id] = order_revenues.get(order_id, 0) + item.get("subtotal", 0)
-
-        total_revenue = sum(
-            revenue for order_id, revenue in order_revenues.items()
-            if next((o for o in orders if o["id"] == order_id), {}).get("delivery_status") == "delivered"
+        cache_key = dashboard_cache.key("advanced-stats", retailer_email)
+        stats, computed_at = snapshot_or_compute(
+            "advanced-stats", retailer_email, fresh=wants_fresh(data),
+            fallback=lambda: dashboard_cache.get_or_compute(cache_key, lambda: compute_advanced_stats(retailer_email))
         )
 
-        # Low stock products (less than 10 items)
-        low_stock_products = sum(1 for p in products if p.get("stock", 0) < 10)
-
-        # Monthly revenue for last 12 months
-        monthly_revenue = get_monthly_revenue_data(orders, order_revenues)
-        
-        # Top selling products
-        top_selling_products = get_top_selling_products(order_items, products)
-        
-        # Recent orders (last 10)
-        recent_orders = get_recent_orders(orders, order_items)
-
-        return jsonify({
-            "total_orders": total_orders,
-            "pending_orders": pending_orders,
-            "confirmed_orders": confirmed_orders,
-            "rejected_orders": rejected_orders,
-            "delivered_orders": delivered_orders,
-            "total_revenue": round(total_revenue, 2),
-            "total_products": len(products),
-            "low_stock_products": low_stock_products,
-            "monthly_revenue": monthly_revenue,
-            "top_selling_products": top_selling_products,
-            "recent_orders": recent_orders
-        }), 200
+        return jsonify({**stats, "computed_at": computed_iso(computed_at)}), 200
 
     except Exception as e:
         print(f"Advanced dashboard error: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
-def get_monthly_revenue_data(orders, order_revenues):
-    """Get monthly revenue data for the last 12 months."""
-    monthly_data = defaultdict(float)
-    
-    # Get date range for last 12 months
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=365)
-    
+def computed_iso(computed_at):
+    """ISO timestamp for a cache computed_at epoch."""
+    return datetime.fromtimestamp(computed_at, timezone.utc).isoformat()
+
+def compute_advanced_stats(retailer_email):
+    """Dashboard statistics from rollups, falling back to the full order history."""
+    try:
+        return advanced_stats_from_rollups(retailer_email)
+    except Exception as rollup_error:
+        print(f"Warning: Rollups unavailable, computing dashboard from history: {str(rollup_error)}")
+        return advanced_stats_from_history(retailer_email)
+
+def advanced_stats_from_rollups(retailer_email):
+    """Build dashboard statistics from the retailer's pre-aggregated rollups."""
+    rollups = load_retailer_rollups(retailer_email)
+    if not rollups:
+        return dict(EMPTY_DASHBOARD_STATS)
+
+    products_response = supabase.table("products").select("id, title, category, stock").eq("retailer_email", retailer_email).execute()
+    products = products_response.data
+
+    # Rollup rows are already aggregated per day and status; fold them into the
+    # same shape aggregate_dashboard() produces for raw orders
+    aggregate = DashboardAggregate()
+    start_day, end_day = (d.strftime("%Y-%m-%d") for d in revenue_window())
+    for row in rollups:
+        status = (row["status"] or "").lower()
+        aggregate.status_counts[status] += row["orders"]
+        if status == "delivered":
+            aggregate.total_revenue += row["revenue"]
+            if start_day <= row["day"] <= end_day:
+                aggregate.monthly_revenue[row["day"][:7]] += row["revenue"]
+
+    # Bestsellers come from the streaming top-k tracker instead of summing product history;
+    # ask for a few extra in case some of them were deleted since
+    for product_id, sales in top_products(retailer_email, k=TOP_PRODUCTS_LIMIT * 2):
+        aggregate.product_sales[product_id] = sales
+
+    recent_orders, recent_items = load_recent_orders(retailer_email)
+    aggregate.items_by_order = group_items_by_order(recent_items)
+
+    return build_dashboard_stats(aggregate, products, recent_orders)
+
+def advanced_stats_from_history(retailer_email):
+    """Compute dashboard statistics directly from the retailer's full order history."""
+    # Get all order items for this retailer
+    order_items_response = supabase.table("order_items").select("*").eq("retailer_email", retailer_email).execute()
+    order_items = order_items_response.data
+
+    if not order_items:
+        return dict(EMPTY_DASHBOARD_STATS)
+
+    # Get all orders and products for this retailer
+    orders = select_in_chunks(lambda: supabase.table("orders").select("*"), "id", [item["order_id"] for item in order_items])
+    products_response = supabase.table("products").select("*").eq("retailer_email", retailer_email).execute()
+    products = products_response.data
+
+    return build_dashboard_stats(aggregate_dashboard(orders, order_items), products, orders)
+
+def build_dashboard_stats(aggregate, products, orders):
+    """Shape a DashboardAggregate into the advanced-stats response."""
+    return {
+        "total_orders": aggregate.total_orders,
+        "pending_orders": aggregate.count(*PENDING_STATUSES),
+        "confirmed_orders": aggregate.count("confirmed"),
+        "rejected_orders": aggregate.count("rejected"),
+        "delivered_orders": aggregate.count("delivered"),
+        "total_revenue": round(aggregate.total_revenue, 2),
+        "total_products": len(products),
+        # Low stock products (less than 10 items)
+        "low_stock_products": sum(1 for p in products if p.get("stock", 0) < 10),
+        "monthly_revenue": get_monthly_revenue_data(aggregate),
+        "top_selling_products": get_top_selling_products(aggregate.product_sales, products),
+        "recent_orders": get_recent_orders(orders, aggregate)
+    }
+
+def load_recent_orders(retailer_email, limit=10):
+    """Load the retailer's latest orders and their line items with two queries."""
+    orders_response = supabase.table("orders").select("*, order_items!inner(order_id)").eq("order_items.retailer_email", retailer_email).order("created_at", desc=True).limit(limit).execute()
+    orders = orders_response.data
     for order in orders:
-        created_at = order.get("created_at")
-        if isinstance(created_at, str):
-            try:
-                date = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-            except ValueError:
-                continue
-        else:
-            date = created_at
-            
-        if start_date <= date <= end_date:
-            month_key = date.strftime("%Y-%m")
-            if order.get("delivery_status") == "delivered":
-                monthly_data[month_key] += order_revenues.get(order["id"], 0)
-    
-    # Convert to list format and fill missing months with 0
-    result = []
-    current_date = start_date.replace(day=1)
-    while current_date <= end_date:
-        month_key = current_date.strftime("%Y-%m")
-        result.append({
-            "month": month_key,
-            "revenue": round(monthly_data[month_key], 2)
-        })
-        # Move to next month
-        if current_date.month == 12:
-            current_date = current_date.replace(year=current_date.year + 1, month=1)
-        else:
-            current_date = current_date.replace(month=current_date.month + 1)
-    
-    return result[-12:]  # Return last 12 months
-
-def get_top_selling_products(order_items, products):
+        order.pop("order_items", None)
+    if not orders:
+        return [], []
+    items_response = supabase.table("order_items").select("*").eq("retailer_email", retailer_email).in_("order_id", [o["id"] for o in orders]).execute()
+    return orders, items_response.data
+
+def get_monthly_revenue_data(aggregate):
+    """Get monthly revenue data for the last 12 months."""
+    return monthly_revenue_series(aggregate.monthly_revenue)
+
+def get_top_selling_products(product_sales, products, limit=TOP_PRODUCTS_LIMIT):
     """Get top selling products based on quantity sold."""
-    product_sales = defaultdict(lambda: {"quantity": 0, "revenue": 0})
-    
-    for item in order_items:
-        product_id = item.get("product_id")
-        quantity = item.get("quantity", 0)
-        subtotal = item.get("subtotal", 0)
-        
-        if product_id:
-            product_sales[product_id]["quantity"] += quantity
-            product_sales[product_id]["revenue"] += subtotal
-    
-    # Get product details and sort by quantity
     product_map = {p["id"]: p for p in products}
-    top_products = []
-    
+    ranked = []
+
     for product_id, sales in product_sales.items():
-        if product_id in product_map:
-            product = product_map[product_id]
-            top_products.append({
+        product = product_map.get(product_id)
+        if product:
+            ranked.append({
                 "id": product_id,
                 "title": product.get("title"),
                 "category": product.get("category"),
@@ -162,26 +167,20 @@ def get_top_selling_products(order_items, products):
                 "revenue": round(sales["revenue"], 2),
                 "stock": product.get("stock", 0)
             })
-    
-    # Sort by quantity sold and return top 5
-    top_products.sort(key=lambda x: x["quantity_sold"], reverse=True)
-    return top_products[:5]
 
-def get_recent_orders(orders, order_items):
+    # Sort by quantity sold and return the top few
+    ranked.sort(key=lambda x: x["quantity_sold"], reverse=True)
+    return ranked[:limit]
+
+def get_recent_orders(orders, aggregate, limit=10):
     """Get recent orders with item details."""
-    # Sort orders by created_at descending
-    sorted_orders = sorted(orders, key=lambda x: x.get("created_at", ""), reverse=True)
-    
-    # Group order items by order_id
-    items_by_order = defaultdict(list)
-    for item in order_items:
-        items_by_order[item["order_id"]].append(item)
-    
+    recent = heapq.nlargest(limit, orders, key=lambda x: x.get("created_at") or "")
+
     recent_orders = []
-    for order in sorted_orders[:10]:  # Last 10 orders
+    for order in recent:
         order_id = order["id"]
-        items = items_by_order.get(order_id, [])
-        
+        items = aggregate.items_by_order.get(order_id, [])
+
         recent_orders.append({
             "id": order_id,
             "user_email": order.get("user_email"),
@@ -191,9 +190,63 @@ def get_recent_orders(orders, order_items):
             "items_count": len(items),
             "items": items
         })
-    
+
     return recent_orders
 
+def get_revenue_series():
+    """Get order counts and revenue bucketed by hour, day, week or month over a date range."""
+    try:
+        data = request.get_json()
+        auth_token = data.get("auth_token")
+        status = data.get("status", "delivered")
+
+        if not auth_token:
+            return jsonify({"error": "auth_token is required"}), 400
+
+        try:
+            params = parse_series_params(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        retailer_email = verify_retailer_token(auth_token)
+        if not retailer_email:
+            return jsonify({"error": "Invalid auth_token"}), 401
+
+        cache_key = dashboard_cache.key(
+            "revenue-series", retailer_email, granularity=params["granularity"], timezone=str(params["tz"]),
+            date_from=data.get("date_from"), date_to=data.get("date_to"), status=status
+        )
+        series, computed_at = dashboard_cache.get_or_compute(cache_key, lambda: compute_revenue_series(retailer_email, params, status))
+
+        return jsonify({
+            "granularity": params["granularity"],
+            "timezone": str(params["tz"]),
+            "status": status,
+            "series": series,
+            "computed_at": computed_iso(computed_at)
+        }), 200
+
+    except Exception as e:
+        print(f"Revenue series error: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+def compute_revenue_series(retailer_email, params, status):
+    """Bucket the retailer's sales in the requested range.
+
+    Whole UTC-day buckets are summed from the daily rollups; anything else buckets
+    the orders in the range with one vectorized pass.
+    """
+    status = None if status == "all" else status
+    if rollups_cover(params, "day"):
+        return rollup_series(load_retailer_rollups(retailer_email), params, "day", "revenue", status)
+
+    orders = select_all(lambda: supabase.table("orders").select("id, delivery_status, created_at, order_items!inner(order_id)").eq("order_items.retailer_email", retailer_email).gte("created_at", params["start"].isoformat()).lte("created_at", params["end"].isoformat()))
+    order_items = select_in_chunks(
+        lambda: supabase.table("order_items").select("order_id, subtotal").eq("retailer_email", retailer_email),
+        "order_id", [order["id"] for order in orders]
+    )
+    return build_series(orders, order_items, params, status)
+
 def get_order_analytics():
     """Get detailed order analytics with filtering options."""
     try:
@@ -210,53 +263,56 @@ def get_order_analytics():
         if not retailer_email:
             return jsonify({"error": "Invalid auth_token"}), 401
 
-        # Get order items for this retailer
-        order_items_response = supabase.table("order_items").select("*").eq("retailer_email", retailer_email).execute()
-        order_items = order_items_response.data
-        order_ids = list(set([item["order_id"] for item in order_items]))
-        
-        if not order_ids:
-            return jsonify({"orders": [], "analytics": {}}), 200
+        cache_key = dashboard_cache.key("order-analytics", retailer_email, status_filter=status_filter, date_from=date_from, date_to=date_to)
+        payload, computed_at = dashboard_cache.get_or_compute(
+            cache_key, lambda: compute_order_analytics(retailer_email, status_filter, date_from, date_to)
+        )
+
+        return jsonify({**payload, "computed_at": computed_iso(computed_at)}), 200
+
+    except Exception as e:
+        print(f"Order analytics error: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+def compute_order_analytics(retailer_email, status_filter, date_from, date_to):
+    """Filtered orders with their items plus analytics for the retailer."""
+    # Get order items for this retailer
+    order_items_response = supabase.table("order_items").select("*").eq("retailer_email", retailer_email).execute()
+    order_items = order_items_response.data
+    order_ids = list(set([item["order_id"] for item in order_items]))
+
+    if not order_ids:
+        return {"orders": [], "analytics": {}}
+
+    # Build query for orders
+    def orders_query():
+        query = supabase.table("orders").select("*")
 
-        # Build query for orders
-        orders_query = supabase.table("orders").select("*").in_("id", order_ids)
-        
         # Apply filters
         if status_filter:
-            orders_query = orders_query.eq("delivery_status", status_filter)
-        
+            query = query.eq("delivery_status", status_filter)
+
         if date_from:
-            orders_query = orders_query.gte("created_at", date_from)
-        
-        if date_to:
-            orders_query = orders_query.lte("created_at", date_to)
-        
-        orders_response = orders_query.order("created_at", desc=True).execute()
-        filtered_orders = orders_response.data
+            query = query.gte("created_at", date_from)
 
-        # Group order items by order_id
-        items_by_order = defaultdict(list)
-        for item in order_items:
-            items_by_order[item["order_id"]].append(item)
+        if date_to:
+            query = query.lte("created_at", date_to)
 
-        # Build filtered orders with items
-        filtered_orders_with_items = []
-        for order in filtered_orders:
-            order_id = order["id"]
-            order["items"] = items_by_order.get(order_id, [])
-            filtered_orders_with_items.append(order)
+        return query
 
-        # Calculate analytics
-        analytics = calculate_order_analytics(filtered_orders, order_items)
+    # Chunks come back in chunk order, so sort the merged result
+    filtered_orders = select_in_chunks(orders_query, "id", order_ids)
+    filtered_orders.sort(key=lambda o: o.get("created_at") or "", reverse=True)
 
-        return jsonify({
-            "orders": filtered_orders_with_items,
-            "analytics": analytics
-        }), 200
+    # Attach items to the filtered orders
+    items_by_order = group_items_by_order(order_items)
+    for order in filtered_orders:
+        order["items"] = items_by_order.get(order["id"], [])
 
-    except Exception as e:
-        print(f"Order analytics error: {str(e)}")
-        return jsonify({"error": "Internal server error"}), 500
+    return {
+        "orders": filtered_orders,
+        "analytics": calculate_order_analytics(filtered_orders, order_items)
+    }
 
 def calculate_order_analytics(orders, order_items):
     """Calculate analytics for filtered orders."""
@@ -267,117 +323,125 @@ def calculate_order_analytics(orders, order_items):
             "average_order_value": 0,
             "status_breakdown": {}
         }
-    
-    total_orders = len(orders)
-    
-    # Calculate revenue for delivered orders only
-    order_revenues = {}
-    for item in order_items:
-        order_id = item["order_id"]
-        order_revenues[order_id] = order_revenues.get(order_id, 0) + item.get("subtotal", 0)
-    
-    delivered_revenue = sum(
-        order_revenues.get(order["id"], 0) 
-        for order in orders 
-        if order.get("delivery_status") == "delivered"
-    )
-    
+
+    frame = OrderFrame(orders, order_items)
+    total_orders = len(frame)
+
+    # Revenue counts delivered orders only
+    delivered_revenue = frame.revenue_for("delivered")
     average_order_value = delivered_revenue / total_orders if total_orders > 0 else 0
-    
-    # Status breakdown
-    status_breakdown = {}
-    for order in orders:
-        status = order.get("delivery_status", "unknown")
-        status_breakdown[status] = status_breakdown.get(status, 0) + 1
-    
+
     return {
         "total_orders": total_orders,
         "total_revenue": round(delivered_revenue, 2),
         "average_order_value": round(average_order_value, 2),
-        "status_breakdown": status_breakdown
+        "status_breakdown": frame.status_breakdown()
     }
 
 def get_product_analytics():
-    """Get detailed product analytics."""
+    """Get a filtered page of the retailer's products plus catalog-wide analytics."""
     try:
         data = request.get_json()
         auth_token = data.get("auth_token")
-        
+        category = data.get("category")
+        stock_band = data.get("stock_band")
+        status = data.get("status")
+
         if not auth_token:
             return jsonify({"error": "auth_token is required"}), 400
 
+        if stock_band and stock_band not in STOCK_BANDS:
+            return jsonify({"error": f"stock_band must be one of {', '.join(STOCK_BANDS)}"}), 400
+
+        if status and status not in PRODUCT_STATUSES:
+            return jsonify({"error": f"status must be one of {', '.join(PRODUCT_STATUSES)}"}), 400
+
+        try:
+            page_size, cursor = read_page_params(data, DEFAULT_PRODUCT_PAGE_SIZE, MAX_PRODUCT_PAGE_SIZE)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
         retailer_email = verify_retailer_token(auth_token)
         if not retailer_email:
             return jsonify({"error": "Invalid auth_token"}), 401
 
-        # Get products
-        products_response = supabase.table("products").select("*").eq("retailer_email", retailer_email).execute()
-        products = products_response.data
-        
-        if not products:
-            return jsonify({
-                "products": [],
-                "analytics": {
-                    "total_products": 0,
-                    "low_stock_count": 0,
-                    "out_of_stock_count": 0,
-                    "category_breakdown": {},
-                    "revenue_by_category": {}
-                }
-            }), 200
-
-        # Get order items for sales data
-        order_items_response = supabase.table("order_items").select("*").eq("retailer_email", retailer_email).execute()
-        order_items = order_items_response.data
-
-        # Calculate product analytics
-        product_analytics = calculate_product_analytics(products, order_items)
+        products, next_cursor = load_product_page(retailer_email, category, stock_band, status, cursor, page_size)
+
+        # Aggregates cover the whole catalog and come from the precomputed summary,
+        # so they cost the same whatever page or filter is requested
+        cache_key = dashboard_cache.key("product-analytics", retailer_email)
+        analytics, computed_at = snapshot_or_compute(
+            "product-analytics", retailer_email, fresh=wants_fresh(data),
+            fallback=lambda: dashboard_cache.get_or_compute(cache_key, lambda: compute_product_analytics(retailer_email))
+        )
 
         return jsonify({
             "products": products,
-            "analytics": product_analytics
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+            "analytics": analytics,
+            "computed_at": computed_iso(computed_at)
         }), 200
 
     except Exception as e:
         print(f"Product analytics error: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
+def load_product_page(retailer_email, category, stock_band, status, cursor, page_size):
+    """One keyset page of the retailer's products, newest first, and the cursor for the next."""
+    query = supabase.table("products").select("*").eq("retailer_email", retailer_email)
+
+    if category:
+        query = query.eq("category", category)
+
+    if status:
+        query = query.eq("status", status)
+
+    # Same bands as product_analytics(): out of stock is 0, low stock is 1-9
+    if stock_band == "out_of_stock":
+        query = query.eq("stock", 0)
+    elif stock_band == "low_stock":
+        query = query.gt("stock", 0).lt("stock", LOW_STOCK_THRESHOLD)
+    elif stock_band == "in_stock":
+        query = query.gte("stock", LOW_STOCK_THRESHOLD)
+
+    return fetch_page(query, cursor, page_size)
+
+def compute_product_analytics(retailer_email):
+    """Catalog and sales analytics summary for the retailer."""
+    products = select_all(lambda: supabase.table("products").select("id, created_at, category, stock").eq("retailer_email", retailer_email))
+
+    if not products:
+        return {
+            "total_products": 0,
+            "low_stock_count": 0,
+            "out_of_stock_count": 0,
+            "category_breakdown": {},
+            "revenue_by_category": {}
+        }
+
+    return calculate_product_analytics(products, load_product_sales(retailer_email))
+
+def load_product_sales(retailer_email):
+    """(product_id, subtotal) rows for the retailer, from product rollups when available.
+
+    Both sources are read in keyset pages; load_product_rollups already pages.
+    """
+    try:
+        rollups = load_product_rollups(retailer_email)
+        if rollups:
+            return [{"product_id": row["product_id"], "subtotal": row["revenue"]} for row in rollups]
+    except Exception as e:
+        print(f"Warning: Product rollups unavailable, summing order items: {str(e)}")
+
+    return select_all(lambda: supabase.table("order_items").select("id, product_id, subtotal").eq("retailer_email", retailer_email), column="id")
+
 def calculate_product_analytics(products, order_items):
     """Calculate analytics for products."""
-    total_products = len(products)
-    low_stock_count = sum(1 for p in products if 0 < p.get("stock", 0) < 10)
-    out_of_stock_count = sum(1 for p in products if p.get("stock", 0) == 0)
-    
-    # Category breakdown
-    category_breakdown = {}
-    for product in products:
-        category = product.get("category", "unknown")
-        category_breakdown[category] = category_breakdown.get(category, 0) + 1
-    
-    # Revenue by category
-    category_revenue = defaultdict(float)
-    product_sales = defaultdict(lambda: {"quantity": 0, "revenue": 0})
-    
-    for item in order_items:
-        product_id = item.get("product_id")
-        quantity = item.get("quantity", 0)
-        subtotal = item.get("subtotal", 0)
-        
-        if product_id:
-            product_sales[product_id]["quantity"] += quantity
-            product_sales[product_id]["revenue"] += subtotal
-    
-    # Group revenue by category
-    for product in products:
-        product_id = product["id"]
-        category = product.get("category", "unknown")
-        if product_id in product_sales:
-            category_revenue[category] += product_sales[product_id]["revenue"]
-    
-    return {
-        "total_products": total_products,
-        "low_stock_count": low_stock_count,
-        "out_of_stock_count": out_of_stock_count,
-        "category_breakdown": category_breakdown,
-        "revenue_by_category": dict(category_revenue)
-    }
\ No newline at end of file
+    return product_analytics(products, order_items)
+
+# Precomputed in the background by utils.snapshotWorker
+register_snapshot("advanced-stats", compute_advanced_stats)
+register_snapshot("product-analytics", compute_product_analytics)
+register_job("retailer-rollups", reconcile_retailer_rollups, RECONCILE_INTERVAL)
@@ -1,13 +1,52 @@
-from flask import request, jsonify
+from flask import request, jsonify, redirect
 from config.supabaseConfig import supabase
 from middleware.authToken import verify_retailer_token
 import os
-import uuid
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.utils import secure_filename
+from utils.queryHelpers import select_in_chunks
+from utils.imageServing import send_image
+from utils.imagePipeline import generate_derivatives
+from utils.imageStorage import (
+    UPLOAD_DIR, UPLOAD_URL_PREFIX, MAX_IMAGE_BYTES, store_upload, upload_path, release_upload, resolve_image_url, legacy_location
+)
+
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+MAX_BATCH_FILES = 20
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_WORKERS = 4
+# Room for multipart boundaries, part headers and the auth_token field
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+def save_image(file, retailer_email):
+    """Validate and store one file uploaded by a retailer; raises ValueError (UploadRejected) with a client message."""
+    if file.filename == '':
+        raise ValueError("No file selected")
+
+    # Check file extension
+    if not ('.' in file.filename and
+            file.filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS):
+        raise ValueError("Invalid file type. Only PNG, JPG, JPEG, GIF, and WebP are allowed")
+
+    # Sniff, size-check and hash while saving; identical content reuses the stored file
+    public_url, file_path, created = store_upload(file.stream, retailer_email)
+
+    # Resized and WebP variants for listing and detail pages
+    derivatives = generate_derivatives(file_path, public_url)
+
+    return {
+        "image_url": public_url,
+        "derivatives": derivatives,
+        "deduplicated": not created
+    }
 
 def upload_product_image():
     """Upload product image and return URL."""
     try:
+        # Refuse oversized uploads from the declared length before parsing the body
+        if request.content_length and request.content_length > MAX_IMAGE_BYTES + MULTIPART_OVERHEAD_BYTES:
+            return jsonify({"error": f"Image exceeds {MAX_IMAGE_BYTES // (1024 * 1024)} MB"}), 413
+
         # Check if auth_token is provided in headers or form data
         auth_token = request.headers.get('auth_token') or request.form.get('auth_token')
         if not auth_token:
@@ -22,39 +61,72 @@ def upload_product_image():
             return jsonify({"error": "No image file provided"}), 400
 
         file = request.files['image']
-        if file.filename == '':
-            return jsonify({"error": "No file selected"}), 400
-
-        # Check file extension
-        allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
-        if not ('.' in file.filename and 
-                file.filename.rsplit('.', 1)[1].lower() in allowed_extensions):
-            return jsonify({"error": "Invalid file type. Only PNG, JPG, JPEG, GIF, and WebP are allowed"}), 400
-
-        # Generate unique filename
-        file_extension = file.filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"{uuid.uuid4()}.{file_extension}"
-        
-        # Create upload path
-        upload_dir = "static/uploads/products"
-        os.makedirs(upload_dir, exist_ok=True)
+        try:
+            saved = save_image(file, retailer_email)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), getattr(e, "status", 400)
         
-        # Save file
-        file_path = os.path.join(upload_dir, unique_filename)
-        file.save(file_path)
-        
-        # Generate public URL
-        public_url = f"/static/uploads/products/{unique_filename}"
-        
-        return jsonify({
-            "image_url": public_url,
-            "message": "Image uploaded successfully"
-        }), 200
+        return jsonify({**saved, "message": "Image uploaded successfully"}), 200
 
     except Exception as e:
         print(f"Image upload error: {str(e)}")
         return jsonify({"error": "Failed to upload image"}), 500
 
+def upload_product_images():
+    """Upload several product images in one multipart request and report each file's result."""
+    try:
+        # Refuse oversized batches from the declared length before parsing the body
+        if request.content_length and request.content_length > MAX_BATCH_BYTES:
+            return jsonify({"error": f"Batch exceeds {MAX_BATCH_BYTES // (1024 * 1024)} MB"}), 413
+
+        auth_token = request.headers.get('auth_token') or request.form.get('auth_token')
+        if not auth_token:
+            return jsonify({"error": "auth_token is required"}), 400
+
+        retailer_email = verify_retailer_token(auth_token)
+        if not retailer_email:
+            return jsonify({"error": "Invalid auth_token"}), 401
+
+        files = request.files.getlist('images')
+        if not files:
+            return jsonify({"error": "No image files provided"}), 400
+        if len(files) > MAX_BATCH_FILES:
+            return jsonify({"error": f"At most {MAX_BATCH_FILES} images can be uploaded at once"}), 400
+
+        # Chunked requests carry no length, so also total the parsed files
+        total_bytes = 0
+        for file in files:
+            file.stream.seek(0, os.SEEK_END)
+            total_bytes += file.stream.tell()
+            file.stream.seek(0)
+        if total_bytes > MAX_BATCH_BYTES:
+            return jsonify({"error": f"Batch exceeds {MAX_BATCH_BYTES // (1024 * 1024)} MB"}), 413
+
+        def save(file):
+            try:
+                return {"filename": file.filename, **save_image(file, retailer_email)}
+            except ValueError as e:
+                return {"filename": file.filename, "error": str(e)}
+            except Exception as e:
+                print(f"Image upload error ({file.filename}): {str(e)}")
+                return {"filename": file.filename, "error": "Failed to upload image"}
+
+        # Hashing and writing are I/O-bound; derivatives already render in the process pool
+        with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(files))) as pool:
+            results = list(pool.map(save, files))
+
+        uploaded = sum(1 for result in results if "error" not in result)
+        return jsonify({
+            "results": results,
+            "uploaded": uploaded,
+            "failed": len(results) - uploaded,
+            "message": f"{uploaded} of {len(results)} image(s) uploaded successfully"
+        }), 200 if uploaded else 400
+
+    except Exception as e:
+        print(f"Batch image upload error: {str(e)}")
+        return jsonify({"error": "Failed to upload images"}), 500
+
 def delete_product_image():
     """Delete a product image file."""
     try:
@@ -70,13 +142,18 @@ def delete_product_image():
             return jsonify({"error": "Invalid auth_token"}), 401
 
         # Extract filename from URL
-        if image_url.startswith("/static/uploads/products/"):
-            filename = image_url.split("/")[-1]
-            file_path = os.path.join("static/uploads/products", filename)
+        if image_url.startswith(UPLOAD_URL_PREFIX):
+            try:
+                # Old flat URLs point at files the layout migration has since moved
+                image_url = resolve_image_url(image_url)
+                file_path = upload_path(image_url)
+            except ValueError:
+                return jsonify({"error": "Invalid image URL"}), 400
             
-            # Delete file if it exists
+            # Drop this retailer's hold; the file goes once nothing else uses it
             if os.path.exists(file_path):
-                os.remove(file_path)
+                if release_upload(image_url, retailer_email) > 0:
+                    return jsonify({"message": "Image deleted successfully", "file_retained": True}), 200
                 return jsonify({"message": "Image deleted successfully"}), 200
             else:
                 return jsonify({"error": "Image file not found"}), 404
@@ -109,10 +186,26 @@ def get_uploaded_images():
             return jsonify({"images": []}), 200
         
         # Get images for these products
-        images_response = supabase.table("product_images").select("*").in_("product_id", product_ids).execute()
+        images = select_in_chunks(lambda: supabase.table("product_images").select("*"), "product_id", product_ids)
         
-        return jsonify({"images": images_response.data}), 200
+        return jsonify({"images": images}), 200
 
     except Exception as e:
         print(f"Get images error: {str(e)}")
-        return jsonify({"error": "Failed to retrieve images"}), 500
\ No newline at end of file
+        return jsonify({"error": "Failed to retrieve images"}), 500
+
+def serve_product_image(filename):
+    """Serve an uploaded product image, redirecting old flat URLs to their sharded location."""
+    if os.path.isfile(os.path.join(UPLOAD_DIR, filename)):
+        return send_image(UPLOAD_DIR, filename)
+    moved_to = legacy_location(filename)
+    if moved_to:
+        return redirect(UPLOAD_URL_PREFIX + moved_to, code=301)
+    return jsonify({"error": "Image not found"}), 404
+
+def serve_public_image(filename):
+    """Serve avatars and other public images with ETag revalidation.
+
+    Profile pictures are stored as static/public/..., so both spellings map to static/Public.
+    """
+    return send_image("static/Public", filename)
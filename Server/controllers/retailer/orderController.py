@@ -1,10 +1,25 @@
-from flask import request, jsonify
+import csv
+import io
+import json
+from flask import request, jsonify, Response, stream_with_context
 from config.supabaseConfig import supabase
 from middleware.authToken import verify_retailer_token
 from datetime import datetime
+from utils.queryHelpers import select_in_chunks, unique_ids, chunked, apply_keyset, read_page_params, fetch_page
+from utils.eventBus import sse_response, retailer_channel, StreamLimitReached
+from utils.orderEvents import publish_order_status_changed
+from utils.rollups import load_retailer_rollups, snapshot_orders, record_status_change
+
+ORDER_STATUSES = ["pending", "confirmed", "rejected", "in_process", "delivered", "returned"]
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_BULK_ORDERS = 500
+EXPORT_PAGE_SIZE = 500
+EXPORT_ORDER_FIELDS = ["id", "created_at", "delivery_status", "full_name", "phone", "address", "city", "postal_code", "payment_method"]
+EXPORT_ITEM_FIELDS = ["product_id", "product_title", "price", "quantity", "subtotal"]
 
 def view_orders():
-    """View coming orders for the retailer, latest to oldest."""
+    """View coming orders for the retailer, latest to oldest, one page at a time."""
     try:
         data = request.get_json()
         auth_token = data.get("auth_token")
@@ -15,30 +30,149 @@ def view_orders():
         if not retailer_email:
             return jsonify({"error": "Invalid auth_token"}), 401
 
-        # Get order_items where retailer_email matches, join with orders
-        # Since order_items has retailer_email, and orders has user_email
-        # Need to get orders that have items from this retailer
-        order_items_response = supabase.table("order_items").select("order_id").eq("retailer_email", retailer_email).execute()
-        order_ids = [item["order_id"] for item in order_items_response.data]
+        try:
+            page_size, cursor = read_page_params(data, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Accept a single status or a list of statuses
+        status_filter = data.get("status")
+        if isinstance(status_filter, str):
+            status_filter = [status_filter]
+        if status_filter is not None and not isinstance(status_filter, list):
+            return jsonify({"error": "status must be a string or a list of strings"}), 400
+        if status_filter and any(s not in ORDER_STATUSES for s in status_filter):
+            return jsonify({"error": f"status must be one of {', '.join(ORDER_STATUSES)}"}), 400
 
-        if not order_ids:
-            return jsonify({"orders": []}), 200
+        # Query 1: one keyset page of distinct orders containing this retailer's items.
+        # The inner embed filters orders by retailer without listing every order_id.
+        orders_query = supabase.table("orders").select("*, order_items!inner(order_id)").eq("order_items.retailer_email", retailer_email)
+        if status_filter:
+            orders_query = orders_query.in_("delivery_status", status_filter)
+        orders, next_cursor = fetch_page(orders_query, cursor, page_size)
 
-        # Get orders, order by created_at desc
-        orders_response = supabase.table("orders").select("*").in_("id", order_ids).order("created_at", desc=True).execute()
-        orders = orders_response.data
+        # Query 2: this retailer's line items for the whole page
+        items_by_order = {}
+        if orders:
+            order_ids = [order["id"] for order in orders]
+            items = select_in_chunks(lambda: supabase.table("order_items").select("*").eq("retailer_email", retailer_email), "order_id", order_ids)
+            for item in items:
+                items_by_order.setdefault(item["order_id"], []).append(item)
 
-        # For each order, get order_items
         for order in orders:
-            items_response = supabase.table("order_items").select("*").eq("order_id", order["id"]).execute()
-            order["items"] = items_response.data
+            order.pop("order_items", None)
+            order["items"] = items_by_order.get(order["id"], [])
 
-        return jsonify({"orders": orders}), 200
+        return jsonify({
+            "orders": orders,
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
+        }), 200
 
     except Exception as e:
         print(f"View orders error: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
+def stream_orders():
+    """Stream new orders and status changes for the retailer as server-sent events."""
+    # EventSource can only send GET requests, so the token comes in the query string
+    auth_token = request.args.get("auth_token")
+    if not auth_token:
+        return jsonify({"error": "auth_token is required"}), 400
+
+    retailer_email = verify_retailer_token(auth_token)
+    if not retailer_email:
+        return jsonify({"error": "Invalid auth_token"}), 401
+
+    try:
+        return sse_response(retailer_channel(retailer_email))
+    except StreamLimitReached as e:
+        return jsonify({"error": str(e)}), 429
+
+def export_orders():
+    """Stream the retailer's orders and line items as CSV or NDJSON."""
+    try:
+        data = request.get_json()
+        auth_token = data.get("auth_token")
+        export_format = data.get("format", "csv")
+        status_filter = data.get("status")
+        date_from = data.get("date_from")
+        date_to = data.get("date_to")
+        if not auth_token:
+            return jsonify({"error": "auth_token is required"}), 400
+        if export_format not in ["csv", "ndjson"]:
+            return jsonify({"error": "format must be csv or ndjson"}), 400
+        if status_filter and status_filter not in ORDER_STATUSES:
+            return jsonify({"error": f"status must be one of {', '.join(ORDER_STATUSES)}"}), 400
+
+        retailer_email = verify_retailer_token(auth_token)
+        if not retailer_email:
+            return jsonify({"error": "Invalid auth_token"}), 401
+
+    except Exception as e:
+        print(f"Export orders error: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+    def order_pages():
+        """Yield (orders, items_by_order) one keyset page at a time."""
+        cursor = None
+        while True:
+            query = supabase.table("orders").select(", ".join(EXPORT_ORDER_FIELDS) + ", order_items!inner(order_id)").eq("order_items.retailer_email", retailer_email)
+            if status_filter:
+                query = query.eq("delivery_status", status_filter)
+            if date_from:
+                query = query.gte("created_at", date_from)
+            if date_to:
+                query = query.lte("created_at", date_to)
+            orders = apply_keyset(query, cursor).limit(EXPORT_PAGE_SIZE).execute().data
+            if not orders:
+                return
+
+            items = select_in_chunks(lambda: supabase.table("order_items").select("order_id, " + ", ".join(EXPORT_ITEM_FIELDS)).eq("retailer_email", retailer_email), "order_id", [o["id"] for o in orders])
+            items_by_order = {}
+            for item in items:
+                items_by_order.setdefault(item["order_id"], []).append(item)
+            yield orders, items_by_order
+
+            if len(orders) < EXPORT_PAGE_SIZE:
+                return
+            cursor = (orders[-1]["created_at"], orders[-1]["id"])
+
+    def csv_rows():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["order_" + f if f == "id" else f for f in EXPORT_ORDER_FIELDS] + EXPORT_ITEM_FIELDS)
+        for orders, items_by_order in order_pages():
+            # One line per item; each page is flushed as a single chunk
+            for order in orders:
+                order_values = [order.get(f) for f in EXPORT_ORDER_FIELDS]
+                for item in items_by_order.get(order["id"], []):
+                    writer.writerow(order_values + [item.get(f) for f in EXPORT_ITEM_FIELDS])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    def ndjson_rows():
+        for orders, items_by_order in order_pages():
+            lines = []
+            for order in orders:
+                order.pop("order_items", None)
+                order["items"] = [{f: item.get(f) for f in EXPORT_ITEM_FIELDS} for item in items_by_order.get(order["id"], [])]
+                lines.append(json.dumps(order, default=str))
+            yield "\n".join(lines) + "\n"
+
+    if export_format == "csv":
+        body, mimetype = csv_rows(), "text/csv"
+    else:
+        body, mimetype = ndjson_rows(), "application/x-ndjson"
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=orders.{export_format}", "X-Accel-Buffering": "no"}
+    )
+
 def confirm_order():
     """Confirm an order."""
     try:
@@ -58,7 +192,10 @@ def confirm_order():
             return jsonify({"error": "Order not found or not associated with your products"}), 404
 
         # Update order status to confirmed
-        supabase.table("orders").update({"delivery_status": "confirmed"}).eq("id", order_id).execute()
+        snapshot = snapshot_orders([order_id])
+        update_response = supabase.table("orders").update({"delivery_status": "confirmed"}).eq("id", order_id).execute()
+        record_status_change(snapshot, "confirmed")
+        publish_order_status_changed(update_response.data, "confirmed")
 
         return jsonify({"message": "Order confirmed successfully"}), 200
 
@@ -86,11 +223,14 @@ def reject_order():
             return jsonify({"error": "Order not found or not associated with your products"}), 404
 
         # Update order status to rejected
-        supabase.table("orders").update({
+        snapshot = snapshot_orders([order_id])
+        update_response = supabase.table("orders").update({
             "delivery_status": "rejected",
             "rejected_by": retailer_email,
             "rejection_reason": rejection_reason
         }).eq("id", order_id).execute()
+        record_status_change(snapshot, "rejected")
+        publish_order_status_changed(update_response.data, "rejected")
 
         return jsonify({"message": "Order rejected successfully"}), 200
 
@@ -98,61 +238,183 @@ def reject_order():
         print(f"Reject order error: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
-def dashboard():
-    """Get dashboard stats for the retailer."""
+def _read_bulk_order_ids(data):
+    """Return the deduplicated order_ids list from a bulk request, or an error message."""
+    order_ids = data.get("order_ids")
+    if not isinstance(order_ids, list) or not order_ids:
+        return None, "order_ids must be a non-empty list"
+    order_ids = unique_ids(order_ids)
+    if len(order_ids) > MAX_BULK_ORDERS:
+        return None, f"At most {MAX_BULK_ORDERS} orders can be updated at once"
+    return order_ids, None
+
+def _bulk_update_orders(retailer_email, order_ids, update_data):
+    """Update the orders this retailer owns; return (updated_ids, not_found_ids)."""
+    # One ownership query for the whole batch (chunked only for very large lists)
+    owned_items = select_in_chunks(lambda: supabase.table("order_items").select("order_id").eq("retailer_email", retailer_email), "order_id", order_ids)
+    owned = {item["order_id"] for item in owned_items}
+    updated_ids = [order_id for order_id in order_ids if order_id in owned]
+    not_found_ids = [order_id for order_id in order_ids if order_id not in owned]
+
+    snapshot = snapshot_orders(updated_ids)
+    updated_orders = []
+    for chunk in chunked(updated_ids):
+        updated_orders.extend(supabase.table("orders").update(update_data).in_("id", chunk).execute().data)
+    record_status_change(snapshot, update_data["delivery_status"])
+    publish_order_status_changed(updated_orders, update_data["delivery_status"])
+
+    return updated_ids, not_found_ids
+
+def bulk_confirm_orders():
+    """Confirm several orders in one request."""
     try:
         data = request.get_json()
         auth_token = data.get("auth_token")
         if not auth_token:
             return jsonify({"error": "auth_token is required"}), 400
 
+        order_ids, error = _read_bulk_order_ids(data)
+        if error:
+            return jsonify({"error": error}), 400
+
         retailer_email = verify_retailer_token(auth_token)
         if not retailer_email:
             return jsonify({"error": "Invalid auth_token"}), 401
 
-        # Get order_ids for this retailer
-        order_items_response = supabase.table("order_items").select("order_id, subtotal").eq("retailer_email", retailer_email).execute()
-        order_ids = list(set([item["order_id"] for item in order_items_response.data]))
-        subtotals = {item["order_id"]: item["subtotal"] for item in order_items_response.data}
-
-        if not order_ids:
-            return jsonify({
-                "total_orders": 0,
-                "total_returned": 0,
-                "total_revenue": 0,
-                "monthly_orders": []
-            }), 200
-
-        # Get orders
-        orders_response = supabase.table("orders").select("id, delivery_status, created_at, total_amount").in_("id", order_ids).execute()
-        orders = orders_response.data
-
-        total_orders = len(orders)
-        total_returned = sum(1 for o in orders if o["delivery_status"] == "returned")
-        delivered_revenue = sum(subtotals.get(o["id"], 0) for o in orders if o["delivery_status"] == "delivered")
-        returned_revenue = sum(subtotals.get(o["id"], 0) for o in orders if o["delivery_status"] == "returned")
-        total_revenue = delivered_revenue - returned_revenue
-
-        # Monthly orders
-        monthly = {}
-        for order in orders:
-            created_at = order["created_at"]
-            if isinstance(created_at, str):
-                date = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-            else:
-                date = created_at
-            month = date.strftime("%Y-%m")
-            monthly[month] = monthly.get(month, 0) + 1
+        updated_ids, not_found_ids = _bulk_update_orders(retailer_email, order_ids, {"delivery_status": "confirmed"})
+
+        return jsonify({
+            "message": f"{len(updated_ids)} order(s) confirmed successfully",
+            "confirmed": updated_ids,
+            "not_found": not_found_ids
+        }), 200
+
+    except Exception as e:
+        print(f"Bulk confirm orders error: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+def bulk_reject_orders():
+    """Reject several orders in one request with a shared rejection reason."""
+    try:
+        data = request.get_json()
+        auth_token = data.get("auth_token")
+        rejection_reason = data.get("rejection_reason")
+        if not auth_token or not rejection_reason:
+            return jsonify({"error": "auth_token, order_ids, and rejection_reason are required"}), 400
 
-        monthly_orders = [{"month": k, "count": v} for k, v in sorted(monthly.items())]
+        order_ids, error = _read_bulk_order_ids(data)
+        if error:
+            return jsonify({"error": error}), 400
+
+        retailer_email = verify_retailer_token(auth_token)
+        if not retailer_email:
+            return jsonify({"error": "Invalid auth_token"}), 401
+
+        updated_ids, not_found_ids = _bulk_update_orders(retailer_email, order_ids, {
+            "delivery_status": "rejected",
+            "rejected_by": retailer_email,
+            "rejection_reason": rejection_reason
+        })
 
         return jsonify({
-            "total_orders": total_orders,
-            "total_returned": total_returned,
-            "total_revenue": total_revenue,
-            "monthly_orders": monthly_orders
+            "message": f"{len(updated_ids)} order(s) rejected successfully",
+            "rejected": updated_ids,
+            "not_found": not_found_ids
         }), 200
 
+    except Exception as e:
+        print(f"Bulk reject orders error: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+def dashboard():
+    """Get dashboard stats for the retailer."""
+    try:
+        data = request.get_json()
+        auth_token = data.get("auth_token")
+        if not auth_token:
+            return jsonify({"error": "auth_token is required"}), 400
+
+        retailer_email = verify_retailer_token(auth_token)
+        if not retailer_email:
+            return jsonify({"error": "Invalid auth_token"}), 401
+
+        try:
+            stats = dashboard_from_rollups(retailer_email)
+        except Exception as rollup_error:
+            print(f"Warning: Rollups unavailable, computing dashboard from history: {str(rollup_error)}")
+            stats = dashboard_from_history(retailer_email)
+
+        return jsonify(stats), 200
+
     except Exception as e:
         print(f"Dashboard error: {str(e)}")
-        return jsonify({"error": "Internal server error"}), 500
\ No newline at end of file
+        return jsonify({"error": "Internal server error"}), 500
+
+def dashboard_from_rollups(retailer_email):
+    """Build dashboard stats from the retailer's daily rollups."""
+    total_orders = 0
+    total_returned = 0
+    total_revenue = 0
+    monthly = {}
+    for row in load_retailer_rollups(retailer_email):
+        total_orders += row["orders"]
+        if row["status"] == "returned":
+            total_returned += row["orders"]
+            total_revenue -= row["revenue"]
+        elif row["status"] == "delivered":
+            total_revenue += row["revenue"]
+        month = row["day"][:7]
+        monthly[month] = monthly.get(month, 0) + row["orders"]
+
+    return {
+        "total_orders": total_orders,
+        "total_returned": total_returned,
+        "total_revenue": round(total_revenue, 2),
+        "monthly_orders": [{"month": k, "count": v} for k, v in sorted(monthly.items()) if v]
+    }
+
+def dashboard_from_history(retailer_email):
+    """Compute dashboard stats directly from the retailer's order history."""
+    # Get order_ids for this retailer
+    order_items_response = supabase.table("order_items").select("order_id, subtotal").eq("retailer_email", retailer_email).execute()
+    order_ids = list(set([item["order_id"] for item in order_items_response.data]))
+    subtotals = {}
+    for item in order_items_response.data:
+        subtotals[item["order_id"]] = subtotals.get(item["order_id"], 0) + item["subtotal"]
+
+    if not order_ids:
+        return {
+            "total_orders": 0,
+            "total_returned": 0,
+            "total_revenue": 0,
+            "monthly_orders": []
+        }
+
+    # Get orders
+    orders = select_in_chunks(lambda: supabase.table("orders").select("id, delivery_status, created_at, total_amount"), "id", order_ids)
+
+    total_orders = len(orders)
+    total_returned = sum(1 for o in orders if o["delivery_status"] == "returned")
+    delivered_revenue = sum(subtotals.get(o["id"], 0) for o in orders if o["delivery_status"] == "delivered")
+    returned_revenue = sum(subtotals.get(o["id"], 0) for o in orders if o["delivery_status"] == "returned")
+    total_revenue = delivered_revenue - returned_revenue
+
+    # Monthly orders
+    monthly = {}
+    for order in orders:
+        created_at = order["created_at"]
+        if isinstance(created_at, str):
+            date = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        else:
+            date = created_at
+        month = date.strftime("%Y-%m")
+        monthly[month] = monthly.get(month, 0) + 1
+
+    monthly_orders = [{"month": k, "count": v} for k, v in sorted(monthly.items())]
+
+    return {
+        "total_orders": total_orders,
+        "total_returned": total_returned,
+        "total_revenue": total_revenue,
+        "monthly_orders": monthly_orders
+    }
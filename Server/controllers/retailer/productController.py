@@ -1,6 +1,7 @@
 from flask import request, jsonify
 from config.supabaseConfig import supabase
 from middleware.authToken import verify_retailer_token
+from utils.productEvents import publish_products_changed
 
 def add_product():
     """Add a new product for the retailer."""
@@ -53,6 +54,8 @@ def add_product():
                     "is_primary": is_primary
                 }).execute()
 
+        publish_products_changed(product_response.data, "added")
+
         return jsonify({"message": "Product added successfully", "product_id": product_id}), 201
 
     except Exception as e:
@@ -128,6 +131,8 @@ def edit_product():
                         "is_primary": is_primary
                     }).execute()
 
+        publish_products_changed(product_response.data, "edited")
+
         return jsonify({"message": "Product updated successfully"}), 200
 
     except Exception as e:
@@ -156,6 +161,7 @@ def delete_product():
         supabase.table("product_images").delete().eq("product_id", product_id).execute()
         # Delete product
         supabase.table("products").delete().eq("id", product_id).execute()
+        publish_products_changed(product_response.data, "deleted")
 
         return jsonify({"message": "Product deleted successfully"}), 200
 
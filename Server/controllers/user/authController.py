@@ -300,4 +300,4 @@ def logout():
 
     except Exception as e:
         print(f"Logout error: {str(e)}")
-        return jsonify({"error": "Internal server error"}), 500
\ No newline at end of file
+        return jsonify({"error": "Internal server error"}), 500
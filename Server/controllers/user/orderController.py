@@ -1,6 +1,10 @@
 from flask import request, jsonify
 from config.supabaseConfig import supabase
 from middleware.authToken import verify_user_token
+from utils.orderEvents import publish_order_placed
+from utils.rollups import record_order_placed
+from utils.bestsellers import record_sales
+from utils.eventBus import sse_response, user_channel, StreamLimitReached
 
 def place_order():
     """Place an order from the user's cart."""
@@ -63,7 +67,8 @@ def place_order():
             "postal_code": postal_code
         }
         order_insert = supabase.table("orders").insert(order_data).execute()
-        order_id = order_insert.data[0]["id"]
+        order = order_insert.data[0]
+        order_id = order["id"]
 
         # Insert order_items and deduct stock
         for item in order_items:
@@ -79,6 +84,11 @@ def place_order():
         # Clear cart
         supabase.table("cart_items").delete().eq("cart_id", cart_id).execute()
 
+        # Update retailer rollups and push the new order to connected dashboards
+        record_order_placed(order, order_items)
+        record_sales(order_items)
+        publish_order_placed(order, order_items)
+
         return jsonify({"message": "Order placed successfully", "order_id": order_id}), 201
 
     except Exception as e:
@@ -107,4 +117,20 @@ def view_orders():
 
     except Exception as e:
         print(f"View orders error: {str(e)}")
-        return jsonify({"error": "Internal server error"}), 500
\ No newline at end of file
+        return jsonify({"error": "Internal server error"}), 500
+
+def stream_order_status():
+    """Stream delivery status changes of the user's orders as server-sent events."""
+    # EventSource can only send GET requests, so the token comes in the query string
+    auth_token = request.args.get("auth_token")
+    if not auth_token:
+        return jsonify({"error": "auth_token is required"}), 400
+
+    user_email = verify_user_token(auth_token)
+    if not user_email:
+        return jsonify({"error": "Invalid auth_token"}), 401
+
+    try:
+        return sse_response(user_channel(user_email))
+    except StreamLimitReached as e:
+        return jsonify({"error": str(e)}), 429
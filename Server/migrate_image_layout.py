@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Move flat product uploads into the sharded, content-addressed layout
+Usage: python migrate_image_layout.py [--dry-run]
+"""
+import argparse
+import hashlib
+import os
+
+from config.supabaseConfig import supabase
+from utils.imagePipeline import DERIVATIVES, derivative_paths
+from utils.imageStorage import (
+    CHUNK_SIZE, SNIFF_BYTES, UPLOAD_DIR, UPLOAD_URL_PREFIX,
+    normalize_extension, record_legacy_locations, shard_path, sniff_image_type
+)
+
+def file_sha256(path):
+    """Hex sha256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def flat_originals():
+    """Original images stored directly in UPLOAD_DIR (not derivatives or temp files)."""
+    suffixes = tuple(f"_{name}" for name in DERIVATIVES)
+    for filename in sorted(os.listdir(UPLOAD_DIR)):
+        stem, extension = os.path.splitext(filename)
+        if not os.path.isfile(os.path.join(UPLOAD_DIR, filename)) or extension == ".part" or stem.endswith(suffixes):
+            continue
+        yield filename
+
+def move(source, target):
+    """Move source to target, dropping source when identical content is already there."""
+    if os.path.exists(target):
+        os.remove(source)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source, target)
+
+def plan_locations():
+    """Map each flat filename to its sharded relative path."""
+    locations = {}
+    for filename in flat_originals():
+        path = os.path.join(UPLOAD_DIR, filename)
+        with open(path, "rb") as source:
+            header = source.read(SNIFF_BYTES)
+        # Name by the real type, as new uploads are; fall back to the old extension
+        extension = sniff_image_type(header) or normalize_extension(os.path.splitext(filename)[1][1:])
+        locations[filename] = shard_path(f"{file_sha256(path)}.{extension}")
+    return locations
+
+def legacy_entries(locations):
+    """Old flat name -> sharded path for every original and each derivative it has."""
+    entries = dict(locations)
+    for filename, relative in locations.items():
+        for name in DERIVATIVES:
+            for old_derivative, new_derivative in zip(derivative_paths(filename, name), derivative_paths(relative, name)):
+                if os.path.exists(os.path.join(UPLOAD_DIR, old_derivative)):
+                    entries[old_derivative] = new_derivative
+    return entries
+
+def relocate_files(locations):
+    for filename, relative in locations.items():
+        old_path = os.path.join(UPLOAD_DIR, filename)
+        new_path = os.path.join(UPLOAD_DIR, relative)
+        for name in DERIVATIVES:
+            for old_derivative, new_derivative in zip(derivative_paths(old_path, name), derivative_paths(new_path, name)):
+                if os.path.exists(old_derivative):
+                    move(old_derivative, new_derivative)
+        move(old_path, new_path)
+
+def rewrite_image_urls(locations):
+    """Point product_images rows at the new URLs and return the set of new URLs.
+
+    The rewritten rows are what keeps each file in use; see release_upload().
+    """
+    for filename, relative in locations.items():
+        supabase.table("product_images").update({"image_url": UPLOAD_URL_PREFIX + relative}).eq("image_url", UPLOAD_URL_PREFIX + filename).execute()
+    return {UPLOAD_URL_PREFIX + relative for relative in locations.values()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="print the planned moves without changing anything")
+    args = parser.parse_args()
+
+    locations = plan_locations()
+    print(f"{len(locations)} flat upload(s) to migrate")
+    if args.dry_run:
+        for filename, relative in locations.items():
+            print(f"  {filename} -> {relative}")
+        return
+
+    # Record the mapping first so old URLs keep resolving while files move
+    record_legacy_locations(legacy_entries(locations))
+    relocate_files(locations)
+    references = rewrite_image_urls(locations)
+    print(f"Moved {len(locations)} file(s) into {len(references)} content-addressed image(s)")
+
+if __name__ == "__main__":
+    main()
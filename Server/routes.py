@@ -9,7 +9,7 @@ from controllers.user.passwordController import (
 from controllers.user.otpController import otpRefresh, validate_otp
 from controllers.user.viewProduct import view_top_products, get_product_by_id, search_products
 from controllers.user.cartController import add_to_cart, remove_from_cart, view_cart
-from controllers.user.orderController import place_order, view_orders
+from controllers.user.orderController import place_order, view_orders, stream_order_status
 
 from controllers.retailer.retailerAuthController import (
     retailerSignup, retailerVerify, retailerLogin, retailerLogout
@@ -25,22 +25,26 @@ from controllers.retailer.productController import (
     add_product, view_products, edit_product, delete_product
 )
 from controllers.retailer.orderController import (
-    view_orders, confirm_order, reject_order, dashboard
+    view_orders, confirm_order, reject_order, dashboard,
+    bulk_confirm_orders, bulk_reject_orders, stream_orders, export_orders
 )
 from controllers.retailer.advancedDashboardController import (
-    get_advanced_dashboard_stats, get_order_analytics, get_product_analytics
+    get_advanced_dashboard_stats, get_order_analytics, get_product_analytics,
+    get_revenue_series
 )
 from controllers.retailer.imageUploadController import (
-    upload_product_image, delete_product_image, get_uploaded_images
+    upload_product_image, upload_product_images, delete_product_image, get_uploaded_images,
+    serve_product_image, serve_public_image
 )
 
 from controllers.admin.adminAuthController import adminLogin, adminLogout
 from controllers.admin.productStatusController import (
     view_pending_products, view_approved_products,
-    view_rejected_products, edit_product_status
+    view_rejected_products, edit_product_status, bulk_edit_product_status
 )
+from controllers.admin.auditController import view_audit_log
 from controllers.admin.ordersStatusController import (
-    view_all_orders, edit_order_status, admin_dashboard
+    view_all_orders, edit_order_status, admin_dashboard, admin_revenue_series
 )
 
 # ===================== Blueprint =====================
@@ -80,6 +84,8 @@ routes.route("/set-new-password", methods=["POST", "OPTIONS"])(set_new_password)
 routes.route("/otp-refresh", methods=["POST", "OPTIONS"])(otpRefresh)
 routes.route("/validate-otp", methods=["POST", "OPTIONS"])(validate_otp)
 
+routes.route("/orders/stream", methods=["GET"])(stream_order_status)
+
 # ===================== 🔐 RETAILER ROUTES =====================
 routes.route("/retailer/signup", methods=["POST", "OPTIONS"])(retailerSignup)
 routes.route("/retailer/verify", methods=["POST", "OPTIONS"])(retailerVerify)
@@ -103,17 +109,27 @@ routes.route("/retailer/delete-product", methods=["POST", "OPTIONS"])(delete_pro
 routes.route("/retailer/view-orders", methods=["POST", "OPTIONS"])(view_orders)
 routes.route("/retailer/confirm-order", methods=["POST", "OPTIONS"])(confirm_order)
 routes.route("/retailer/reject-order", methods=["POST", "OPTIONS"])(reject_order)
+routes.route("/retailer/bulk-confirm-orders", methods=["POST", "OPTIONS"])(bulk_confirm_orders)
+routes.route("/retailer/bulk-reject-orders", methods=["POST", "OPTIONS"])(bulk_reject_orders)
 routes.route("/retailer/dashboard", methods=["POST", "OPTIONS"])(dashboard)
+routes.route("/retailer/orders/stream", methods=["GET"])(stream_orders)
+routes.route("/retailer/orders/export", methods=["POST", "OPTIONS"])(export_orders)
 
 # ===================== 🚀 ADVANCED DASHBOARD ROUTES =====================
 routes.route("/retailer/dashboard/advanced-stats", methods=["POST", "OPTIONS"])(get_advanced_dashboard_stats)
 routes.route("/retailer/orders/analytics", methods=["POST", "OPTIONS"])(get_order_analytics)
 routes.route("/retailer/products/analytics", methods=["POST", "OPTIONS"])(get_product_analytics)
+routes.route("/retailer/dashboard/revenue-series", methods=["POST", "OPTIONS"])(get_revenue_series)
 
 # ===================== 📸 IMAGE UPLOAD ROUTES =====================
 routes.route("/retailer/upload-image", methods=["POST", "OPTIONS"])(upload_product_image)
+routes.route("/retailer/upload-images", methods=["POST", "OPTIONS"])(upload_product_images)
 routes.route("/retailer/delete-image", methods=["POST", "OPTIONS"])(delete_product_image)
 routes.route("/retailer/images", methods=["POST", "OPTIONS"])(get_uploaded_images)
+# Takes precedence over the app's /static route so relocated uploads keep resolving
+routes.route("/static/uploads/products/<path:filename>", methods=["GET"])(serve_product_image)
+routes.route("/static/Public/<path:filename>", methods=["GET"])(serve_public_image)
+routes.route("/static/public/<path:filename>", methods=["GET"], endpoint="serve_public_image_lowercase")(serve_public_image)
 
 # ===================== ️ ADMIN ROUTES =====================
 routes.route("/admin/login", methods=["POST", "OPTIONS"])(adminLogin)
@@ -123,7 +139,10 @@ routes.route("/admin/view-pending-products", methods=["POST", "OPTIONS"])(view_p
 routes.route("/admin/view-approved-products", methods=["POST", "OPTIONS"])(view_approved_products)
 routes.route("/admin/view-rejected-products", methods=["POST", "OPTIONS"])(view_rejected_products)
 routes.route("/admin/edit-product-status", methods=["POST", "OPTIONS"])(edit_product_status)
+routes.route("/admin/bulk-edit-product-status", methods=["POST", "OPTIONS"])(bulk_edit_product_status)
 
 routes.route("/admin/view-all-orders", methods=["POST", "OPTIONS"])(view_all_orders)
 routes.route("/admin/edit-order-status", methods=["POST", "OPTIONS"])(edit_order_status)
 routes.route("/admin/dashboard", methods=["POST", "OPTIONS"])(admin_dashboard)
+routes.route("/admin/dashboard/revenue-series", methods=["POST", "OPTIONS"])(admin_revenue_series)
+routes.route("/admin/audit-log", methods=["POST", "OPTIONS"])(view_audit_log)
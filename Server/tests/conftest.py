@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Unit tests import the server modules directly, as app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from utils.analyticsEngine import _parse_utc_seconds, to_datetime64
+
+def stamp(text):
+    return np.datetime64(text, "s")
+
+def test_parse_reads_the_second_prefix():
+    parsed = _parse_utc_seconds(["2026-01-31T23:59:59+00:00", "2024-02-29 00:00:00Z"])
+    assert parsed.tolist() == [stamp("2026-01-31T23:59:59").item(), stamp("2024-02-29T00:00:00").item()]
+
+def test_parse_rejects_impossible_dates_and_odd_shapes():
+    assert _parse_utc_seconds(["2026-02-30T00:00:00+00:00"]) is None
+    assert _parse_utc_seconds(["2025-02-29T00:00:00+00:00"]) is None
+    assert _parse_utc_seconds(["2026-13-01T00:00:00+00:00"]) is None
+    assert _parse_utc_seconds(["2026-01-01T24:00:00+00:00"]) is None
+    assert _parse_utc_seconds(["2026/01/01T00:00:00+00:00"]) is None
+    assert _parse_utc_seconds(["2026-01-0xT00:00:00+00:00"]) is None
+
+def test_fractional_seconds_are_truncated():
+    stamps = to_datetime64(["2026-05-01T10:00:00.999999+00:00", "2026-05-01T10:00:00.5Z"])
+    assert (stamps == stamp("2026-05-01T10:00:00")).all()
+
+def test_offsets_are_converted_to_utc():
+    stamps = to_datetime64(["2026-05-01T10:00:00+05:30", "2026-05-01T10:00:00.250-04:00", "2026-05-01T10:00:00+00:00"])
+    assert stamps.tolist() == [
+        datetime(2026, 5, 1, 4, 30),
+        datetime(2026, 5, 1, 14, 0),
+        datetime(2026, 5, 1, 10, 0),
+    ]
+
+def test_invalid_values_become_nat():
+    stamps = to_datetime64(["2026-02-30T00:00:00+00:00", "2026-03-01T00:00:00+00:00"])
+    assert np.isnat(stamps[0])
+    assert stamps[1] == stamp("2026-03-01T00:00:00")
+
+    stamps = to_datetime64([None, "garbage", "2026-03-01T00:00:00+99:xx", "2026-03-01T00:00:00+01:00"])
+    assert np.isnat(stamps[:3]).all()
+    assert stamps[3] == stamp("2026-02-28T23:00:00")
+
+def test_datetimes_are_accepted():
+    aware = datetime(2026, 5, 1, 12, 0, tzinfo=timezone(timedelta(hours=2)))
+    stamps = to_datetime64([aware, datetime(2026, 5, 1, 12, 0)])
+    assert stamps.tolist() == [datetime(2026, 5, 1, 10, 0), datetime(2026, 5, 1, 12, 0)]
@@ -0,0 +1,41 @@
+import random
+import pytest
+
+# bestsellers imports the Supabase client at module level
+pytest.importorskip("supabase")
+from utils.bestsellers import SpaceSaving
+
+def test_seed_keeps_exact_top_totals():
+    totals = {product_id: (product_id % 100 + 1, 10.0 * product_id) for product_id in range(300)}
+    tracker = SpaceSaving(capacity=50).seed(totals)
+
+    top = tracker.top(5)
+    expected = sorted(totals, key=lambda product_id: totals[product_id][0], reverse=True)[:5]
+    assert [counter["quantity"] for _, counter in top] == [totals[product_id][0] for product_id in expected]
+    assert all(counter["error"] == 0 for _, counter in top)
+    assert len(tracker.counters) == 50
+
+def test_offer_counts_exactly_below_capacity():
+    tracker = SpaceSaving(capacity=3)
+    for key, quantity in [("a", 2), ("b", 1), ("a", 3)]:
+        tracker.offer(key, quantity, revenue=quantity * 10)
+    assert tracker.counters["a"] == {"quantity": 5, "revenue": 50, "error": 0}
+    assert tracker.counters["b"] == {"quantity": 1, "revenue": 10, "error": 0}
+
+def test_eviction_inherits_the_floor_as_error():
+    tracker = SpaceSaving(capacity=2).seed({"a": (10, 0), "b": (4, 0)})
+    tracker.offer("c", 1)
+    assert "b" not in tracker.counters
+    assert tracker.counters["c"] == {"quantity": 5, "revenue": 0, "error": 4}
+
+def test_guaranteed_count_never_exceeds_true_count():
+    rng = random.Random(7)
+    stream = [(f"p{rng.randint(1, 40)}", rng.randint(1, 5)) for _ in range(2000)]
+    tracker = SpaceSaving(capacity=10)
+    true_counts = {}
+    for key, quantity in stream:
+        tracker.offer(key, quantity)
+        true_counts[key] = true_counts.get(key, 0) + quantity
+
+    for key, counter in tracker.counters.items():
+        assert counter["quantity"] - counter["error"] <= true_counts[key] <= counter["quantity"]
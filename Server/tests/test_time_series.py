@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import pytest
+from utils.timeSeries import MAX_BUCKETS, bucket_edges, parse_series_params
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+def widths(edges):
+    return [(later - earlier) / timedelta(hours=1) for earlier, later in zip(edges, edges[1:])]
+
+def test_day_buckets_follow_dst_transitions():
+    # Clocks spring forward on 2026-03-08 and fall back on 2026-11-01
+    spring = bucket_edges(datetime(2026, 3, 7, tzinfo=NEW_YORK), datetime(2026, 3, 9, 12, tzinfo=NEW_YORK), "day", NEW_YORK)
+    assert [edge.astimezone(NEW_YORK).hour for edge in spring] == [0] * len(spring)
+    assert widths(spring)[:3] == [24, 23, 24]
+
+    autumn = bucket_edges(datetime(2026, 10, 31, tzinfo=NEW_YORK), datetime(2026, 11, 2, 12, tzinfo=NEW_YORK), "day", NEW_YORK)
+    assert widths(autumn)[:3] == [24, 25, 24]
+
+def test_hour_buckets_neither_repeat_nor_skip_across_dst():
+    start = datetime(2026, 11, 1, 0, tzinfo=NEW_YORK)
+    edges = bucket_edges(start, start + timedelta(hours=4), "hour", NEW_YORK)
+    assert set(widths(edges)) == {1}
+    # 01:00 happens twice that night, once per offset
+    assert [edge.astimezone(NEW_YORK).hour for edge in edges[:4]] == [0, 1, 1, 2]
+
+    start = datetime(2026, 3, 8, 0, tzinfo=NEW_YORK)
+    edges = bucket_edges(start, start + timedelta(hours=4), "hour", NEW_YORK)
+    assert [edge.astimezone(NEW_YORK).hour for edge in edges[:4]] == [0, 1, 3, 4]
+
+def test_edges_cover_the_range():
+    start = datetime(2026, 1, 15, 10, tzinfo=timezone.utc)
+    end = datetime(2026, 4, 2, tzinfo=timezone.utc)
+    edges = bucket_edges(start, end, "month", timezone.utc)
+    assert edges[0] == datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert edges[-2] <= end < edges[-1]
+
+def test_bucket_cap_is_enforced():
+    last_hour = datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(hours=MAX_BUCKETS - 1)
+    within = {"granularity": "hour", "date_from": "2026-01-01T00:00:00Z", "date_to": last_hour.isoformat()}
+    params = parse_series_params(within)
+    assert len(params["edges"]) - 1 == MAX_BUCKETS
+
+    too_long = {**within, "date_to": "2026-12-31T00:00:00Z"}
+    with pytest.raises(ValueError, match="Range too large"):
+        parse_series_params(too_long)
+
+def test_invalid_params_are_rejected():
+    with pytest.raises(ValueError, match="granularity"):
+        parse_series_params({"granularity": "minute"})
+    with pytest.raises(ValueError, match="timezone"):
+        parse_series_params({"timezone": "Mars/Olympus"})
+    with pytest.raises(ValueError, match="ISO 8601"):
+        parse_series_params({"date_from": "2026-02-30"})
+    with pytest.raises(ValueError, match="before"):
+        parse_series_params({"date_from": "2026-02-02", "date_to": "2026-02-01"})
@@ -0,0 +1,201 @@
+from datetime import datetime, timezone
+from itertools import repeat
+from operator import itemgetter
+import numpy as np
+
+# Columnar analytics over Supabase rows. Rows are converted to NumPy arrays once
+# and every breakdown after that is a vectorized group-by instead of a dict loop.
+# Columns are pulled out of the row dicts with one list pass each and handed to
+# NumPy whole; per-row generators into np.fromiter cost about twice as much.
+
+_UTC_SUFFIXES = ("", "Z", "+00:00")
+# (start, width) of each number in "YYYY-MM-DDTHH:MM:SS" and its separators
+_ISO_FIELDS = ((0, 4), (5, 2), (8, 2), (11, 2), (14, 2), (17, 2))
+_ISO_SEPARATORS = {4: b"-", 7: b"-", 13: b":", 16: b":"}
+
+def _parse_utc_seconds(values):
+    """Vectorized parse of the "YYYY-MM-DDTHH:MM:SS" prefix of ISO strings.
+
+    Reads the digits straight from a byte array instead of letting NumPy parse each
+    string, which is about twice as fast. Returns None if any value is not in
+    exactly that shape, so the caller can fall back to NumPy's parser.
+    """
+    chars = np.array(values, dtype="S19").view(np.uint8).reshape(-1, 19)
+    if not all((chars[:, position] == ord(separator)).all() for position, separator in _ISO_SEPARATORS.items()):
+        return None
+    if not ((chars[:, 10] == ord("T")) | (chars[:, 10] == ord(" "))).all():
+        return None
+
+    fields = []
+    for start, width in _ISO_FIELDS:
+        value = np.zeros(len(chars), dtype=np.int32)
+        for position in range(start, start + width):
+            # Bytes below "0" wrap around in uint8, so one bound rejects every non-digit
+            digit = chars[:, position] - np.uint8(ord("0"))
+            if (digit > 9).any():
+                return None
+            value = value * 10 + digit
+        fields.append(value)
+    year, month, day, hour, minute, second = fields
+    if ((month < 1) | (month > 12) | (day < 1) | (hour > 23) | (minute > 59) | (second > 59)).any():
+        return None
+
+    months = ((year - 1970) * 12 + month - 1).astype("datetime64[M]")
+    month_starts = months.astype("datetime64[D]")
+    if (day > ((months + 1).astype("datetime64[D]") - month_starts).astype(np.int32)).any():
+        return None
+    offsets = (day - 1) * 86400 + hour * 3600 + minute * 60 + second
+    return month_starts.astype("datetime64[s]") + offsets.astype("timedelta64[s]")
+
+def _offset_seconds(suffix):
+    """Seconds east of UTC for an ISO offset suffix like +05:00."""
+    sign = -1 if suffix[0] == "-" else 1
+    hours, _, minutes = suffix[1:].partition(":")
+    return sign * (int(hours) * 3600 + int(minutes or 0) * 60)
+
+def to_datetime64(values):
+    """Convert ISO timestamps (or datetimes) to a UTC datetime64[s] array; bad values become NaT."""
+    # Fast path: Supabase returns every timestamptz as an ISO string in UTC, so only
+    # the "YYYY-MM-DDTHH:MM:SS" prefix matters; NumPy truncates to it in bulk.
+    try:
+        if all(map(str.endswith, values, repeat(("+00:00", "Z")))):
+            stamps = _parse_utc_seconds(values)
+            return stamps if stamps is not None else np.array(values, dtype="U19").astype("datetime64[s]")
+    except (TypeError, ValueError):
+        pass
+
+    text = []
+    offsets = {}
+    for position, value in enumerate(values):
+        if isinstance(value, datetime):
+            if value.tzinfo is not None:
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            text.append(value.isoformat()[:19])
+        elif isinstance(value, str) and len(value) >= 10:
+            text.append(value[:19])
+            suffix = value[19:]
+            if suffix.startswith("."):
+                suffix = suffix.lstrip(".0123456789")
+            if suffix not in _UTC_SUFFIXES:
+                try:
+                    offsets[position] = _offset_seconds(suffix)
+                except ValueError:
+                    text[-1] = "NaT"
+        else:
+            text.append("NaT")
+
+    try:
+        stamps = np.array(text, dtype="datetime64[s]")
+    except ValueError:
+        stamps = np.array([_safe_datetime64(t) for t in text], dtype="datetime64[s]")
+    if offsets:
+        positions = np.fromiter(offsets.keys(), dtype=np.int64)
+        stamps[positions] -= np.fromiter(offsets.values(), dtype=np.int64).astype("timedelta64[s]")
+    return stamps
+
+def _safe_datetime64(text):
+    try:
+        return np.datetime64(text, "s")
+    except ValueError:
+        return np.datetime64("NaT", "s")
+
+def as_datetime64(date):
+    """Convert an aware or naive (UTC) datetime to datetime64[s]."""
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(date, "s")
+
+def group_sum(keys, weights=None):
+    """Sum weights (or count rows when weights is None) per distinct key."""
+    keys = np.asarray(keys)
+    if keys.size == 0:
+        return {}
+    labels, codes = np.unique(keys, return_inverse=True)
+    totals = np.bincount(codes.ravel(), weights=weights, minlength=len(labels))
+    if weights is None:
+        return {label.item(): int(total) for label, total in zip(labels, totals)}
+    return {label.item(): float(total) for label, total in zip(labels, totals)}
+
+def _labels(values, default="unknown"):
+    return np.array([value if value is not None else default for value in values], dtype=str)
+
+def _encode(values, default="unknown"):
+    """Categorical encoding: distinct labels in first-seen order and an int code per row."""
+    values = [default if value is None else value for value in values]
+    lookup = {label: code for code, label in enumerate(dict.fromkeys(values))}
+    return list(lookup), np.array(list(map(lookup.__getitem__, values)), dtype=np.int64)
+
+class OrderFrame:
+    """Orders as columns: id index, UTC created_at, categorical status and revenue.
+
+    Statuses are stored as integer codes into status_labels. revenue[i] is the sum
+    of the line item subtotals belonging to order i; items for orders outside the
+    frame are ignored. With order_items=None, revenue is each order's total_amount.
+    """
+
+    def __init__(self, orders, order_items=()):
+        self.ids = list(map(itemgetter("id"), orders))
+        self.index = dict(zip(self.ids, range(len(self.ids))))
+        self.status_labels, self.status_codes = _encode([order.get("delivery_status") for order in orders])
+        self.created_at = to_datetime64([order.get("created_at") for order in orders])
+
+        if order_items is None:
+            self.revenue = np.array([order.get("total_amount") or 0 for order in orders], dtype=np.float64)
+            return
+
+        positions = np.array(list(map(self.index.get, map(itemgetter("order_id"), order_items), repeat(-1))), dtype=np.int64)
+        subtotals = np.array([item.get("subtotal") or 0 for item in order_items], dtype=np.float64)
+        matched = positions >= 0
+        self.revenue = np.bincount(positions[matched], weights=subtotals[matched], minlength=len(self.ids))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def status_breakdown(self, lowercase=False):
+        """Order count per delivery status."""
+        counts = np.bincount(self.status_codes, minlength=len(self.status_labels))
+        breakdown = {}
+        for label, count in zip(self.status_labels, counts.tolist()):
+            key = label.lower() if lowercase else label
+            breakdown[key] = breakdown.get(key, 0) + count
+        return breakdown
+
+    def status_mask(self, status):
+        """Boolean mask of orders whose status matches, ignoring case."""
+        matching = [code for code, label in enumerate(self.status_labels) if label.lower() == status.lower()]
+        return np.isin(self.status_codes, matching)
+
+    def revenue_for(self, status):
+        """Total revenue of orders in the given status."""
+        return float(self.revenue[self.status_mask(status)].sum())
+
+    def bucketed_revenue(self, status, start, end, unit="M"):
+        """Revenue of orders in status per calendar bucket (numpy unit, e.g. "M" or "D") within [start, end]."""
+        mask = self.status_mask(status) & ~np.isnat(self.created_at)
+        mask &= (self.created_at >= as_datetime64(start)) & (self.created_at <= as_datetime64(end))
+        if not mask.any():
+            return {}
+        buckets = self.created_at[mask].astype(f"datetime64[{unit}]")
+        labels, codes = np.unique(buckets, return_inverse=True)
+        totals = np.bincount(codes.ravel(), weights=self.revenue[mask], minlength=len(labels))
+        return dict(zip(np.datetime_as_string(labels, unit=unit).tolist(), totals.tolist()))
+
+def product_analytics(products, order_items):
+    """Stock bands, category counts and revenue per category for a retailer's catalog."""
+    stock = np.array([p.get("stock") or 0 for p in products], dtype=np.float64)
+    categories = _labels(p.get("category") for p in products)
+
+    index = {p["id"]: position for position, p in enumerate(products)}
+    positions = np.array([index.get(item.get("product_id"), -1) for item in order_items], dtype=np.int64)
+    subtotals = np.array([item.get("subtotal") or 0 for item in order_items], dtype=np.float64)
+    matched = positions >= 0
+    product_revenue = np.bincount(positions[matched], weights=subtotals[matched], minlength=len(products))
+    has_sales = np.bincount(positions[matched], minlength=len(products)) > 0
+
+    return {
+        "total_products": len(products),
+        "low_stock_count": int(((stock > 0) & (stock < 10)).sum()),
+        "out_of_stock_count": int((stock == 0).sum()),
+        "category_breakdown": group_sum(categories),
+        "revenue_by_category": group_sum(categories[has_sales], product_revenue[has_sales])
+    }
@@ -0,0 +1,147 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from config.supabaseConfig import supabase
+from utils.queryHelpers import apply_keyset
+
+# Audit trail of admin actions. Requests only enqueue an entry; a background thread
+# writes entries in batches to the admin_audit table:
+#   admin_audit(id uuid, admin, action, target_type, target_ids jsonb, details jsonb, created_at)
+# With AUDIT_LOG_SINK=file, or when a table write still fails after WRITE_ATTEMPTS
+# tries, entries are appended as JSON lines to AUDIT_LOG_FILE instead so nothing is
+# lost. Table queries also read that file, so fallback entries stay visible.
+
+AUDIT_TABLE = "admin_audit"
+AUDIT_SINK = os.getenv("AUDIT_LOG_SINK", "table")
+AUDIT_FILE = os.getenv("AUDIT_LOG_FILE", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "admin_audit.log"))
+FLUSH_INTERVAL_SECONDS = 2
+FLUSH_BATCH_SIZE = 200
+QUEUE_SIZE = 10000
+WRITE_ATTEMPTS = 3
+RETRY_DELAY_SECONDS = 1
+
+_queue = queue.Queue(maxsize=QUEUE_SIZE)
+_file_lock = threading.Lock()
+_start_lock = threading.Lock()
+_writer = None
+
+def record_admin_action(admin, action, target_type, target_ids, details=None):
+    """Queue an audit entry; never blocks or raises into the request."""
+    entry = {
+        "id": str(uuid.uuid4()),
+        "admin": admin,
+        "action": action,
+        "target_type": target_type,
+        "target_ids": list(target_ids),
+        "details": details or {},
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    _start_writer()
+    try:
+        _queue.put_nowait(entry)
+    except queue.Full:
+        print(f"Audit queue full, writing entry synchronously: {action}")
+        _append_to_file([entry])
+
+def _append_to_file(entries):
+    with _file_lock:
+        os.makedirs(os.path.dirname(AUDIT_FILE), exist_ok=True)
+        with open(AUDIT_FILE, "a", encoding="utf-8") as log_file:
+            for entry in entries:
+                log_file.write(json.dumps(entry, default=str) + "\n")
+
+def _write_batch(entries):
+    if AUDIT_SINK == "table" and supabase is not None:
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                supabase.table(AUDIT_TABLE).insert(entries).execute()
+                return
+            except Exception as e:
+                if attempt == WRITE_ATTEMPTS:
+                    print(f"Audit log table write failed, appending to {AUDIT_FILE}: {str(e)}")
+                else:
+                    time.sleep(RETRY_DELAY_SECONDS * attempt)
+    _append_to_file(entries)
+
+def _drain(block):
+    """Take up to FLUSH_BATCH_SIZE queued entries, waiting for the first one if block."""
+    entries = []
+    try:
+        entries.append(_queue.get(timeout=FLUSH_INTERVAL_SECONDS) if block else _queue.get_nowait())
+        while len(entries) < FLUSH_BATCH_SIZE:
+            entries.append(_queue.get_nowait())
+    except queue.Empty:
+        pass
+    return entries
+
+def _run_writer():
+    while True:
+        entries = _drain(block=True)
+        if entries:
+            try:
+                _write_batch(entries)
+            except Exception as e:
+                print(f"Audit log write error: {str(e)}")
+
+def flush():
+    """Write everything still queued; called at interpreter exit."""
+    entries = _drain(block=False)
+    while entries:
+        _write_batch(entries)
+        entries = _drain(block=False)
+
+def _start_writer():
+    global _writer
+    if _writer is not None:
+        return
+    with _start_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_run_writer, name="admin-audit", daemon=True)
+            _writer.start()
+            atexit.register(flush)
+
+def query_audit_log(admin=None, action=None, target_id=None, cursor=None, limit=50):
+    """One page of audit entries, newest first, plus whether more follow.
+
+    cursor is a decoded (created_at, id) pair from a previous page. In table mode
+    the page also merges entries that fell back to the file.
+    """
+    rows = _query_file(admin, action, target_id, cursor, limit + 1)
+    if AUDIT_SINK == "table":
+        query = supabase.table(AUDIT_TABLE).select("*")
+        if admin:
+            query = query.eq("admin", admin)
+        if action:
+            query = query.eq("action", action)
+        if target_id:
+            query = query.contains("target_ids", [target_id])
+        table_rows = apply_keyset(query, cursor).limit(limit + 1).execute().data
+        if rows:
+            seen = {row["id"] for row in table_rows}
+            rows = table_rows + [row for row in rows if row["id"] not in seen]
+            rows.sort(key=lambda row: (row["created_at"], row["id"]), reverse=True)
+        else:
+            rows = table_rows
+    return rows[:limit], len(rows) > limit
+
+def _query_file(admin, action, target_id, cursor, limit):
+    entries = []
+    with _file_lock:
+        if os.path.exists(AUDIT_FILE):
+            with open(AUDIT_FILE, encoding="utf-8") as log_file:
+                entries = [json.loads(line) for line in log_file if line.strip()]
+
+    entries = [
+        e for e in entries
+        if (not admin or e["admin"] == admin)
+        and (not action or e["action"] == action)
+        and (not target_id or target_id in e["target_ids"])
+        and (not cursor or (e["created_at"], e["id"]) < (cursor[0], cursor[1]))
+    ]
+    entries.sort(key=lambda e: (e["created_at"], e["id"]), reverse=True)
+    return entries[:limit]
@@ -0,0 +1,176 @@
+import heapq
+import threading
+from collections import defaultdict
+from config.supabaseConfig import supabase
+from utils.queryHelpers import select_all
+from utils.rollups import PRODUCT_ROLLUPS, RECONCILE_INTERVAL
+from utils.snapshotWorker import register_job
+
+# Streaming bestseller tracking with the Space-Saving algorithm: each tracker keeps
+# at most `capacity` counters, so reading the top products is O(capacity) no matter
+# how many orders were placed. Trackers start from the exact top `capacity` totals,
+# and only live sales go through the approximate update, where a product that
+# replaces an evicted one inherits its count as `error`. Callers get the guaranteed
+# part, quantity - error, so a reported count never exceeds the true one.
+# Trackers only see this process's orders, so they are rebuilt from the rollups
+# every RECONCILE_INTERVAL seconds to pick up sales placed through other workers.
+
+TRACKER_CAPACITY = 50
+PLATFORM_CAPACITY = 200
+
+class SpaceSaving:
+    """Approximate heavy hitters over a stream of (key, weight) updates."""
+
+    def __init__(self, capacity=TRACKER_CAPACITY):
+        self.capacity = capacity
+        self.counters = {}
+
+    def seed(self, totals):
+        """Start from exact {key: (quantity, revenue)} totals, keeping the largest with no error."""
+        largest = heapq.nlargest(self.capacity, totals.items(), key=lambda pair: pair[1][0])
+        self.counters = {key: {"quantity": quantity, "revenue": revenue, "error": 0} for key, (quantity, revenue) in largest}
+        return self
+
+    def offer(self, key, quantity=1, revenue=0):
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter["quantity"] += quantity
+            counter["revenue"] += revenue
+            return
+        if len(self.counters) < self.capacity:
+            self.counters[key] = {"quantity": quantity, "revenue": revenue, "error": 0}
+            return
+        # Replace the smallest counter; the newcomer inherits its count as error bound
+        evicted = min(self.counters, key=lambda k: self.counters[k]["quantity"])
+        floor = self.counters.pop(evicted)["quantity"]
+        self.counters[key] = {"quantity": floor + quantity, "revenue": revenue, "error": floor}
+
+    def top(self, k):
+        """The k keys with the highest counts as (key, counter) pairs."""
+        return sorted(self.counters.items(), key=lambda pair: pair[1]["quantity"], reverse=True)[:k]
+
+_retailer_trackers = {}
+_platform_tracker = None
+# Sales recorded while a tracker is being seeded, keyed by retailer (None = platform)
+_seeding = {}
+_lock = threading.Lock()
+
+def _seed(tracker, rows):
+    totals = defaultdict(lambda: [0, 0])
+    for row in rows:
+        if row.get("product_id"):
+            totals[row["product_id"]][0] += row.get("quantity", 0)
+            totals[row["product_id"]][1] += row.get("revenue", 0)
+    return tracker.seed(totals)
+
+def _load_sales(retailer_email=None):
+    """Per-product sales rows used to seed a tracker, preferring the rollup tables."""
+    def rollup_query():
+        query = supabase.table(PRODUCT_ROLLUPS).select("id, day, product_id, items, revenue")
+        return query.eq("retailer_email", retailer_email) if retailer_email else query
+
+    def item_query():
+        query = supabase.table("order_items").select("id, product_id, quantity, subtotal")
+        return query.eq("retailer_email", retailer_email) if retailer_email else query
+
+    try:
+        rows = select_all(rollup_query, column="day")
+        if rows or not retailer_email:
+            return [{"product_id": r["product_id"], "quantity": r["items"], "revenue": r["revenue"]} for r in rows]
+    except Exception as e:
+        print(f"Warning: Could not seed bestsellers from rollups: {str(e)}")
+
+    rows = select_all(item_query, column="id")
+    return [{"product_id": r["product_id"], "quantity": r["quantity"], "revenue": r["subtotal"]} for r in rows]
+
+def _build_tracker(retailer_email=None):
+    """Seed a new tracker, replaying sales recorded while the seed was loading.
+
+    A sale that the seed query already saw may be replayed too; the overcount is
+    bounded by one seed's duration and gone at the next reseed.
+    """
+    with _lock:
+        pending = _seeding.setdefault(retailer_email, [])
+    try:
+        if retailer_email:
+            tracker = _seed(SpaceSaving(TRACKER_CAPACITY), _load_sales(retailer_email))
+        else:
+            tracker = _seed(SpaceSaving(PLATFORM_CAPACITY), _load_sales())
+    except Exception:
+        with _lock:
+            if _seeding.get(retailer_email) is pending:
+                del _seeding[retailer_email]
+        raise
+    with _lock:
+        if _seeding.get(retailer_email) is pending:
+            del _seeding[retailer_email]
+        for item in pending:
+            tracker.offer(item["product_id"], item.get("quantity", 0), item.get("subtotal", 0))
+    return tracker
+
+def _retailer_tracker(retailer_email):
+    with _lock:
+        tracker = _retailer_trackers.get(retailer_email)
+    if tracker is None:
+        # Seed outside the lock; a concurrent seed of the same retailer just wins the race
+        tracker = _build_tracker(retailer_email)
+        with _lock:
+            tracker = _retailer_trackers.setdefault(retailer_email, tracker)
+    return tracker
+
+def _get_platform_tracker():
+    global _platform_tracker
+    if _platform_tracker is None:
+        tracker = _build_tracker()
+        with _lock:
+            if _platform_tracker is None:
+                _platform_tracker = tracker
+    return _platform_tracker
+
+def reseed_trackers():
+    """Rebuild the platform tracker and drop retailer trackers so they reseed on next use."""
+    global _platform_tracker
+    with _lock:
+        _retailer_trackers.clear()
+        seeded = _platform_tracker is not None
+    if seeded:
+        tracker = _build_tracker()
+        with _lock:
+            _platform_tracker = tracker
+
+# Trackers live in each process, so every process reseeds its own
+register_job("bestseller-reseed", reseed_trackers, RECONCILE_INTERVAL, per_process=True)
+
+def record_sales(order_items):
+    """Count a new order's line items in the seeded trackers and those being seeded.
+
+    Trackers that are not seeded yet will pick these items up when they are seeded.
+    """
+    try:
+        with _lock:
+            for item in order_items:
+                if not item.get("product_id"):
+                    continue
+                tracker = _retailer_trackers.get(item["retailer_email"])
+                if tracker is not None:
+                    tracker.offer(item["product_id"], item.get("quantity", 0), item.get("subtotal", 0))
+                if item["retailer_email"] in _seeding:
+                    _seeding[item["retailer_email"]].append(item)
+                if _platform_tracker is not None:
+                    _platform_tracker.offer(item["product_id"], item.get("quantity", 0), item.get("subtotal", 0))
+                if None in _seeding:
+                    _seeding[None].append(item)
+    except Exception as e:
+        print(f"Bestseller update error: {str(e)}")
+
+def top_products(retailer_email=None, k=5):
+    """Bestselling product ids with their sales, for a retailer or platform-wide.
+
+    quantity is the guaranteed count (at most `error` below the true one).
+    """
+    tracker = _retailer_tracker(retailer_email) if retailer_email else _get_platform_tracker()
+    with _lock:
+        return [
+            (product_id, {**counter, "quantity": counter["quantity"] - counter["error"]})
+            for product_id, counter in tracker.top(k)
+        ]
@@ -0,0 +1,84 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from utils.analyticsEngine import OrderFrame, group_sum
+
+# Aggregation shared by the retailer dashboard endpoints. Kept free of Flask and
+# Supabase imports so it can be benchmarked on synthetic data.
+
+PENDING_STATUSES = ("pending", "processing", "confirmed")
+
+def revenue_window(now=None):
+    """Start and end of the trailing 12 month revenue window."""
+    end_date = now or datetime.now(timezone.utc)
+    return end_date - timedelta(days=365), end_date
+
+def group_items_by_order(order_items):
+    """Index line items by order_id."""
+    items_by_order = defaultdict(list)
+    for item in order_items:
+        items_by_order[item["order_id"]].append(item)
+    return items_by_order
+
+class DashboardAggregate:
+    """Everything the dashboard needs from orders and line items, built in one pass each."""
+
+    def __init__(self):
+        self.status_counts = defaultdict(int)
+        self.items_by_order = defaultdict(list)
+        self.product_sales = defaultdict(lambda: {"quantity": 0, "revenue": 0})
+        self.monthly_revenue = defaultdict(float)
+        self.total_revenue = 0
+
+    @property
+    def total_orders(self):
+        return sum(self.status_counts.values())
+
+    def count(self, *statuses):
+        return sum(self.status_counts[s] for s in statuses)
+
+def aggregate_dashboard(orders, order_items, now=None):
+    """Aggregate a retailer's orders and line items for the dashboard.
+
+    Revenue counts delivered orders only; monthly revenue is limited to the
+    trailing 12 month window. Order and product figures come from vectorized
+    group-bys; the only row loop groups line items per order.
+    """
+    aggregate = DashboardAggregate()
+    aggregate.items_by_order = group_items_by_order(order_items)
+
+    product_ids = [item.get("product_id") for item in order_items]
+    sold = [position for position, product_id in enumerate(product_ids) if product_id]
+    if sold:
+        keys = np.array([product_ids[p] for p in sold])
+        quantities = group_sum(keys, np.fromiter((order_items[p].get("quantity", 0) for p in sold), dtype=np.float64, count=len(sold)))
+        revenues = group_sum(keys, np.fromiter((order_items[p].get("subtotal", 0) for p in sold), dtype=np.float64, count=len(sold)))
+        for product_id, quantity in quantities.items():
+            aggregate.product_sales[product_id] = {"quantity": int(quantity), "revenue": revenues[product_id]}
+
+    frame = OrderFrame(orders, order_items)
+    start_date, end_date = revenue_window(now)
+    aggregate.status_counts.update(frame.status_breakdown(lowercase=True))
+    aggregate.total_revenue = frame.revenue_for("delivered")
+    aggregate.monthly_revenue.update(frame.bucketed_revenue("delivered", start_date, end_date))
+
+    return aggregate
+
+def monthly_revenue_series(monthly_revenue, now=None):
+    """List the last 12 months of revenue, filling months without sales with 0."""
+    start_date, end_date = revenue_window(now)
+    result = []
+    current_date = start_date.replace(day=1)
+    while current_date <= end_date:
+        month_key = current_date.strftime("%Y-%m")
+        result.append({
+            "month": month_key,
+            "revenue": round(monthly_revenue.get(month_key, 0), 2)
+        })
+        # Move to next month
+        if current_date.month == 12:
+            current_date = current_date.replace(year=current_date.year + 1, month=1)
+        else:
+            current_date = current_date.replace(month=current_date.month + 1)
+
+    return result[-12:]
@@ -0,0 +1,158 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from flask import Response, request, stream_with_context
+
+# In-process pub/sub for live order events. Each worker process has its own bus,
+# so subscribers only see events published by requests handled in the same process.
+
+HEARTBEAT_SECONDS = 15
+SUBSCRIBER_QUEUE_SIZE = 100
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+# Every open stream pins a worker thread, so cap them per process and per account
+MAX_OPEN_STREAMS = int(os.getenv("MAX_OPEN_STREAMS", "200"))
+MAX_STREAMS_PER_CHANNEL = int(os.getenv("MAX_STREAMS_PER_CHANNEL", "3"))
+
+_subscribers = defaultdict(set)
+_listeners = []
+_open_streams = 0
+_lock = threading.Lock()
+
+class StreamLimitReached(Exception):
+    """Raised when a new stream would exceed the per-worker or per-channel cap."""
+
+class Subscriber:
+    """Bounded event queue for one connection.
+
+    When the client reads slower than events arrive, the oldest events are dropped
+    and the stream emits a single "resync" event so the client can refetch state.
+    """
+
+    def __init__(self, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        self.events = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self._drop_lock = threading.Lock()
+
+    def offer(self, event):
+        """Queue an event without blocking, evicting the oldest one if full."""
+        while True:
+            try:
+                self.events.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                    with self._drop_lock:
+                        self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def take_dropped(self):
+        """Return and reset the number of events dropped since the last call."""
+        with self._drop_lock:
+            dropped, self.dropped = self.dropped, 0
+        return dropped
+
+def retailer_channel(retailer_email):
+    """Channel carrying order events for one retailer."""
+    return f"retailer:{retailer_email}"
+
+def user_channel(user_email):
+    """Channel carrying order status events for one shopper."""
+    return f"user:{user_email}"
+
+def add_listener(callback):
+    """Call callback(channel, event) synchronously for every published event.
+
+    Listeners are for cheap in-process reactions such as cache invalidation;
+    they must not block.
+    """
+    with _lock:
+        _listeners.append(callback)
+
+def publish(channel, event_type, payload):
+    """Deliver an event to every subscriber of channel without blocking the publisher."""
+    event = {"type": event_type, "data": payload, "published_at": time.time()}
+    with _lock:
+        subscribers = list(_subscribers.get(channel, ()))
+        listeners = list(_listeners)
+    for listener in listeners:
+        try:
+            listener(channel, event)
+        except Exception as e:
+            print(f"Event listener error: {str(e)}")
+    for subscriber in subscribers:
+        subscriber.offer(event)
+
+def subscribe(channel):
+    """Register a new subscriber on channel, enforcing the open stream caps."""
+    global _open_streams
+    with _lock:
+        if _open_streams >= MAX_OPEN_STREAMS:
+            raise StreamLimitReached("Too many open streams on this server")
+        if len(_subscribers.get(channel, ())) >= MAX_STREAMS_PER_CHANNEL:
+            raise StreamLimitReached("Too many open streams for this account")
+        subscriber = Subscriber()
+        _subscribers[channel].add(subscriber)
+        _open_streams += 1
+    return subscriber
+
+def unsubscribe(channel, subscriber):
+    """Remove a subscriber from channel."""
+    global _open_streams
+    with _lock:
+        subscribers = _subscribers.get(channel)
+        if subscribers is not None and subscriber in subscribers:
+            subscribers.discard(subscriber)
+            _open_streams -= 1
+            if not subscribers:
+                del _subscribers[channel]
+
+def format_sse(event):
+    """Encode an event as a server-sent events frame."""
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+def sse_stream(channel):
+    """Subscribe to channel and return (frames generator, close callback).
+
+    Subscribing happens eagerly so callers can turn StreamLimitReached into an
+    HTTP error before the response starts. The generator only unsubscribes when it
+    runs, so callers must also call close once the response ends.
+    """
+    subscriber = subscribe(channel)
+
+    def frames():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = subscriber.events.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    # Comment frames keep proxies from closing an idle connection
+                    yield ": heartbeat\n\n"
+                    continue
+                dropped = subscriber.take_dropped()
+                if dropped:
+                    yield format_sse({"type": "resync", "data": {"dropped_events": dropped}})
+                yield format_sse(event)
+        finally:
+            unsubscribe(channel, subscriber)
+
+    return frames(), lambda: unsubscribe(channel, subscriber)
+
+def sse_response(channel):
+    """Server-sent events response for channel; raises StreamLimitReached.
+
+    HEAD requests never iterate the body, so they get the headers without taking
+    a stream slot. The subscription is released when the server closes the
+    response, even if the body was never started.
+    """
+    if request.method == "HEAD":
+        return Response(mimetype="text/event-stream", headers=SSE_HEADERS)
+    frames, close = sse_stream(channel)
+    response = Response(stream_with_context(frames), mimetype="text/event-stream", headers=SSE_HEADERS)
+    response.call_on_close(close)
+    return response
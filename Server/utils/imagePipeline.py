@@ -0,0 +1,116 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image, ImageOps
+
+# Resized derivatives of uploaded product images. Each derivative is written next to
+# the original as <stem>_<name>.<ext> plus a <stem>_<name>.webp variant, so listing
+# pages can fetch a small thumbnail instead of the full upload. A full-size
+# <stem>.webp is written as well, which send_image() serves for the original URL to
+# browsers that accept WebP. Resizing is CPU-bound,
+# so it runs in a small process pool rather than on the request thread's GIL. Images
+# above MAX_IMAGE_PIXELS are skipped: a small compressed file can decode to hundreds
+# of MB, and a worker killed for running out of memory breaks the pool.
+
+DERIVATIVES = {"thumb": 160, "card": 480, "detail": 1200}
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+PIPELINE_TIMEOUT_SECONDS = 30
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(40 * 1000 * 1000)))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+        return _pool
+
+def _reset_pool(broken):
+    """Replace a broken pool so later uploads get fresh workers."""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+def derivative_paths(original_path, name):
+    """(same-format path, webp path) of one derivative of original_path."""
+    stem, extension = os.path.splitext(original_path)
+    return f"{stem}_{name}{extension}", f"{stem}_{name}.webp"
+
+def original_webp_path(original_path):
+    """Full-size WebP variant of original_path, or None when the original already is WebP."""
+    stem, extension = os.path.splitext(original_path)
+    return None if extension.lower() == ".webp" else f"{stem}.webp"
+
+def _rendered_paths(original_path):
+    paths = [path for name in DERIVATIVES for path in derivative_paths(original_path, name)]
+    webp_path = original_webp_path(original_path)
+    return paths + [webp_path] if webp_path else paths
+
+def _render(original_path):
+    """Write every derivative of original_path; runs in a worker process."""
+    with Image.open(original_path) as image:
+        # The header gives the size before any pixel data is decoded
+        width, height = image.size
+        if width * height > MAX_IMAGE_PIXELS:
+            raise ValueError(f"Image is {width}x{height}, above the {MAX_IMAGE_PIXELS} pixel limit for derivatives")
+        # Honour camera rotation before discarding EXIF with the resize
+        image = ImageOps.exif_transpose(image)
+        image_format = image.format or Image.registered_extensions().get(os.path.splitext(original_path)[1].lower())
+        webp_path = original_webp_path(original_path)
+        if webp_path and image_format != "WEBP":
+            image.save(webp_path, "WEBP", quality=WEBP_QUALITY, method=4)
+        for name, max_side in DERIVATIVES.items():
+            resized = image.copy()
+            resized.thumbnail((max_side, max_side), Image.LANCZOS)
+            path, webp_path = derivative_paths(original_path, name)
+
+            if image_format == "JPEG":
+                resized.convert("RGB").save(path, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+            elif image_format == "PNG":
+                resized.save(path, "PNG", optimize=True)
+            else:
+                resized.save(path, image_format)
+            if image_format != "WEBP":
+                resized.save(webp_path, "WEBP", quality=WEBP_QUALITY, method=4)
+    return True
+
+def generate_derivatives(original_path, public_url):
+    """Render derivatives of an uploaded image and return their public URLs.
+
+    Returns {name: {"url", "webp_url"}}, or {} for GIFs (resizing would drop the
+    animation) and when rendering fails, in which case callers keep using the original.
+    """
+    if os.path.splitext(original_path)[1].lower() == ".gif":
+        return {}
+    # Deduplicated uploads already have their derivatives
+    rendered = all(os.path.exists(path) for path in _rendered_paths(original_path))
+    if not rendered:
+        pool = _get_pool()
+        try:
+            pool.submit(_render, original_path).result(timeout=PIPELINE_TIMEOUT_SECONDS)
+        except BrokenProcessPool as e:
+            _reset_pool(pool)
+            print(f"Warning: Image worker died, restarting the pool: {str(e)}")
+            return {}
+        except Exception as e:
+            print(f"Warning: Could not generate image derivatives: {str(e)}")
+            return {}
+
+    urls = {}
+    for name in DERIVATIVES:
+        url, webp_url = derivative_paths(public_url, name)
+        urls[name] = {"url": url, "webp_url": webp_url}
+    return urls
+
+def remove_derivatives(original_path):
+    """Delete every derivative file of original_path that exists."""
+    for path in _rendered_paths(original_path):
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,50 @@
+import os
+import re
+from flask import request, send_file
+from werkzeug.exceptions import NotFound
+from werkzeug.utils import safe_join
+
+# Image responses that browsers and CDNs can cache hard. Content-addressed and
+# uuid-named uploads never change under the same URL, so they get a year-long
+# immutable Cache-Control; other files (avatars) must revalidate, which costs a
+# 304 thanks to the strong ETag. send_file handles If-None-Match and Range.
+# Browsers that accept WebP get the .webp sibling of a JPEG/PNG when one exists:
+# <stem>.webp for an original, <stem>_<name>.webp for a derivative (see imagePipeline).
+
+IMMUTABLE_MAX_AGE = 31536000
+_IMMUTABLE_NAME = re.compile(r"^([0-9a-f]{64}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})(_[a-z]+)?$")
+_CONTENT_ADDRESSED = re.compile(r"^[0-9a-f]{64}[_.]")
+_WEBP_SOURCES = {".jpg", ".jpeg", ".png"}
+
+def is_immutable(path):
+    """True for files whose name changes whenever their content does."""
+    return bool(_IMMUTABLE_NAME.match(os.path.splitext(os.path.basename(path))[0]))
+
+def _etag(path):
+    name = os.path.basename(path)
+    if _CONTENT_ADDRESSED.match(name):
+        # The name already is the content hash (plus derivative and format)
+        return name
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+def send_image(directory, filename):
+    """Serve directory/filename with validators, long-lived caching and WebP negotiation."""
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+
+    negotiable = os.path.splitext(path)[1].lower() in _WEBP_SOURCES
+    if negotiable and "image/webp" in request.headers.get("Accept", ""):
+        webp_path = os.path.splitext(path)[0] + ".webp"
+        if os.path.isfile(webp_path):
+            path = webp_path
+
+    response = send_file(os.path.abspath(path), conditional=True, etag=_etag(path))
+    if is_immutable(path):
+        response.headers["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        response.headers["Cache-Control"] = "public, no-cache"
+    if negotiable:
+        response.vary.add("Accept")
+    return response
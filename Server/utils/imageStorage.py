@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import posixpath
+import re
+import tempfile
+import threading
+import uuid
+from config.supabaseConfig import supabase
+from utils.imagePipeline import remove_derivatives
+
+# Content-addressed storage for product images. Uploads are hashed while they are
+# streamed to disk and stored as <sha256>.<ext>, so identical photos share one file.
+# Every retailer that uploads a file holds it, recorded once per retailer in:
+#   image_holders(sha256, holder, image_url), unique (sha256, holder)
+# release_upload() drops the caller's hold and only removes the file once no retailer
+# holds it and no product_images row uses it, so repeated deletes are harmless.
+# Several processes share UPLOAD_DIR, so the ordering is what keeps a held file on
+# disk, not a lock: an upload records its hold before it looks for the file, and a
+# release moves the file aside and counts the holders again before deleting it,
+# putting it back if a hold appeared in between.
+# Files are sharded by hash prefix (ab/cd/abcd....jpg) to keep directories small.
+# Flat uuid-named files from before are relocated by migrate_image_layout.py, which
+# records old name -> new location in LEGACY_MAP_PATH so old URLs still resolve.
+
+UPLOAD_DIR = "static/uploads/products"
+UPLOAD_URL_PREFIX = "/static/uploads/products/"
+# Kept outside static/ so the mapping itself is never publicly served
+LEGACY_MAP_PATH = os.getenv("IMAGE_LEGACY_MAP", "image_legacy_map.json")
+IMAGE_HOLDERS = "image_holders"
+CHUNK_SIZE = 64 * 1024
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+SNIFF_BYTES = 12
+
+_SHA256_NAME = re.compile(r"^[0-9a-f]{64}$")
+_legacy_map = {"mtime": None, "entries": {}}
+_legacy_lock = threading.Lock()
+
+class UploadRejected(ValueError):
+    """An upload that is too large or not really an image; status is the HTTP code to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+def sniff_image_type(header):
+    """Extension matching an image's magic bytes, or None if it is not a supported image."""
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+def _size_label(size):
+    return f"{size // (1024 * 1024)} MB" if size >= 1024 * 1024 else f"{size // 1024} KB"
+
+def _stream_size(stream):
+    """Size of a seekable stream without consuming it, or None."""
+    try:
+        position = stream.tell()
+        size = stream.seek(0, os.SEEK_END)
+        stream.seek(position)
+        return size - position
+    except (AttributeError, OSError, ValueError):
+        return None
+
+def normalize_extension(extension):
+    """Canonical extension so the same content never gets two names."""
+    extension = extension.lower()
+    return "jpg" if extension == "jpeg" else extension
+
+def shard_path(filename):
+    """Relative location of a content-addressed file: ab/cd/<filename>."""
+    return posixpath.join(filename[:2], filename[2:4], filename)
+
+def relative_path(image_url):
+    """Path of an upload URL relative to UPLOAD_DIR; raises ValueError if it escapes it."""
+    relative = image_url[len(UPLOAD_URL_PREFIX):] if image_url.startswith(UPLOAD_URL_PREFIX) else os.path.basename(image_url)
+    relative = posixpath.normpath(relative)
+    if relative.startswith(("..", "/")) or relative == ".":
+        raise ValueError("Invalid image URL")
+    return relative
+
+def upload_path(image_url):
+    """Filesystem path of an uploaded image URL."""
+    return os.path.join(UPLOAD_DIR, relative_path(image_url))
+
+def _legacy_entries():
+    """Old flat filename -> sharded relative path, reloaded when the map file changes."""
+    try:
+        mtime = os.path.getmtime(LEGACY_MAP_PATH)
+    except OSError:
+        return {}
+    with _legacy_lock:
+        if _legacy_map["mtime"] != mtime:
+            with open(LEGACY_MAP_PATH, encoding="utf-8") as map_file:
+                _legacy_map["entries"] = json.load(map_file)
+            _legacy_map["mtime"] = mtime
+        return _legacy_map["entries"]
+
+def record_legacy_locations(locations):
+    """Merge {old filename: new relative path} into the legacy map."""
+    with _legacy_lock:
+        entries = {}
+        if os.path.exists(LEGACY_MAP_PATH):
+            with open(LEGACY_MAP_PATH, encoding="utf-8") as map_file:
+                entries = json.load(map_file)
+        entries.update(locations)
+        temp_path = LEGACY_MAP_PATH + ".part"
+        with open(temp_path, "w", encoding="utf-8") as map_file:
+            json.dump(entries, map_file)
+        os.replace(temp_path, LEGACY_MAP_PATH)
+
+def legacy_location(relative):
+    """Sharded relative path an old flat file was moved to, or None."""
+    return _legacy_entries().get(relative)
+
+def resolve_image_url(image_url):
+    """Current URL of an uploaded image, following relocations of old flat URLs."""
+    relative = relative_path(image_url)
+    if os.path.exists(os.path.join(UPLOAD_DIR, relative)):
+        return UPLOAD_URL_PREFIX + relative
+    moved_to = legacy_location(relative)
+    return UPLOAD_URL_PREFIX + moved_to if moved_to else image_url
+
+def content_hash(image_url):
+    """sha256 of a content-addressed image URL, or None for legacy uuid names."""
+    stem = os.path.splitext(os.path.basename(image_url))[0]
+    return stem if _SHA256_NAME.match(stem) else None
+
+def store_upload(stream, holder, max_bytes=MAX_IMAGE_BYTES):
+    """Validate and stream an upload to disk under its content hash.
+
+    The real type comes from the magic bytes, not the client's filename, and the
+    upload is rejected with UploadRejected as soon as either check fails: the size
+    before anything is copied when the stream can report it, otherwise mid-stream.
+    The stored file is held for holder (the uploading retailer). Returns
+    (public_url, file_path, created); created is False when identical content
+    was already stored and the existing file is reused.
+    """
+    size = _stream_size(stream)
+    if size is not None and size > max_bytes:
+        raise UploadRejected(f"Image exceeds the {_size_label(max_bytes)} limit", 413)
+
+    header = b""
+    while len(header) < SNIFF_BYTES:
+        chunk = stream.read(SNIFF_BYTES - len(header))
+        if not chunk:
+            break
+        header += chunk
+    extension = sniff_image_type(header)
+    if extension is None:
+        raise UploadRejected("File content is not a PNG, JPG, GIF or WebP image")
+
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    digest = hashlib.sha256(header)
+    written = len(header)
+    descriptor, temp_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+    try:
+        with os.fdopen(descriptor, "wb") as temp_file:
+            temp_file.write(header)
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadRejected(f"Image exceeds the {_size_label(max_bytes)} limit", 413)
+                digest.update(chunk)
+                temp_file.write(chunk)
+
+        relative = shard_path(f"{digest.hexdigest()}.{extension}")
+        file_path = os.path.join(UPLOAD_DIR, relative)
+        public_url = UPLOAD_URL_PREFIX + relative
+        # Hold first: a release that starts after this sees the hold and keeps the file,
+        # and one already deleting it has moved it aside, so we put our copy in place
+        add_reference(public_url, holder)
+        created = not os.path.exists(file_path)
+        if created:
+            # Atomic rename, so readers never see a partially written file
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return public_url, file_path, created
+
+def add_reference(image_url, holder):
+    """Record holder as a user of a content-addressed image; holding twice is a no-op.
+
+    Errors propagate: an upload whose hold was not recorded must fail rather than
+    leave a file that the next release would delete from under it.
+    """
+    sha256 = content_hash(image_url)
+    if not sha256:
+        return
+    supabase.table(IMAGE_HOLDERS).upsert(
+        {"sha256": sha256, "holder": holder, "image_url": image_url}, on_conflict="sha256,holder", ignore_duplicates=True
+    ).execute()
+
+def release_upload(image_url, holder):
+    """Drop holder's hold on an uploaded image and delete it once nothing uses it.
+
+    Returns how many holders and product images still use it; 0 means the file
+    and its derivatives were removed. Releasing a hold that is already gone only
+    recounts, so a retried delete never takes away another holder's reference.
+    Legacy uuid-named files are never shared and have no holders, so only the
+    product_images rows using them keep them.
+    """
+    file_path = upload_path(image_url)
+    sha256 = content_hash(image_url)
+    if sha256:
+        supabase.table(IMAGE_HOLDERS).delete().eq("sha256", sha256).eq("holder", holder).execute()
+    remaining = _count_users(image_url, sha256)
+    if remaining:
+        return remaining
+
+    # Move the file aside before the final count, so an upload of the same content
+    # that holds it meanwhile either is counted here or writes a fresh copy
+    doomed_path = f"{file_path}.{uuid.uuid4().hex}.deleting"
+    try:
+        os.replace(file_path, doomed_path)
+    except FileNotFoundError:
+        return 0
+    remaining = _count_users(image_url, sha256)
+    if remaining:
+        if not os.path.exists(file_path):
+            os.replace(doomed_path, file_path)
+        else:
+            os.remove(doomed_path)
+        return remaining
+    os.remove(doomed_path)
+    if not os.path.exists(file_path):
+        remove_derivatives(file_path)
+    return 0
+
+def _count_users(image_url, sha256):
+    """Holders plus product_images rows that use an image."""
+    remaining = _count_image_rows(image_url)
+    if sha256:
+        remaining += supabase.table(IMAGE_HOLDERS).select("holder", count="exact").eq("sha256", sha256).execute().count or 0
+    return remaining
+
+def _count_image_rows(image_url):
+    return supabase.table("product_images").select("id", count="exact").eq("image_url", image_url).execute().count or 0
@@ -0,0 +1,53 @@
+from config.supabaseConfig import supabase
+from utils.eventBus import publish, retailer_channel, user_channel
+from utils.queryHelpers import select_in_chunks
+
+def publish_order_placed(order, order_items):
+    """Notify each retailer with items in a new order."""
+    items_by_retailer = {}
+    for item in order_items:
+        items_by_retailer.setdefault(item["retailer_email"], []).append(item)
+
+    for retailer_email, items in items_by_retailer.items():
+        publish(retailer_channel(retailer_email), "order_placed", {
+            "order_id": order["id"],
+            "delivery_status": order.get("delivery_status"),
+            "created_at": order.get("created_at"),
+            "city": order.get("city"),
+            "items": items,
+            "retailer_total": sum(item.get("subtotal", 0) for item in items)
+        })
+
+def publish_order_status_changed(orders, status):
+    """Notify shoppers and retailers that orders moved to a new delivery status.
+
+    orders are the rows returned by the status update, so each carries its user_email;
+    the retailers involved are looked up from order_items.
+    """
+    if not orders:
+        return
+
+    for order in orders:
+        if order.get("user_email"):
+            publish(user_channel(order["user_email"]), "order_status_changed", {
+                "order_id": order["id"],
+                "delivery_status": status,
+                "rejection_reason": order.get("rejection_reason")
+            })
+
+    order_ids = [order["id"] for order in orders]
+    try:
+        items = select_in_chunks(lambda: supabase.table("order_items").select("order_id, retailer_email"), "order_id", order_ids)
+    except Exception as e:
+        print(f"Order event lookup error: {str(e)}")
+        return
+
+    order_ids_by_retailer = {}
+    for item in items:
+        order_ids_by_retailer.setdefault(item["retailer_email"], set()).add(item["order_id"])
+
+    for retailer_email, retailer_order_ids in order_ids_by_retailer.items():
+        publish(retailer_channel(retailer_email), "order_status_changed", {
+            "order_ids": [order_id for order_id in order_ids if order_id in retailer_order_ids],
+            "delivery_status": status
+        })
@@ -0,0 +1,17 @@
+from utils.eventBus import publish, retailer_channel
+
+def publish_products_changed(products, change):
+    """Notify retailers that some of their products were added, edited, deleted or moderated.
+
+    products are rows (or dicts) carrying at least id and retailer_email.
+    """
+    ids_by_retailer = {}
+    for product in products:
+        if product.get("retailer_email"):
+            ids_by_retailer.setdefault(product["retailer_email"], []).append(product["id"])
+
+    for retailer_email, product_ids in ids_by_retailer.items():
+        publish(retailer_channel(retailer_email), "products_changed", {
+            "product_ids": product_ids,
+            "change": change
+        })
@@ -0,0 +1,114 @@
+import base64
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+# PostgREST puts in_() filters in the URL; keep each request well under common URL limits
+IN_CHUNK_SIZE = 200
+MAX_CHUNK_WORKERS = 4
+# Stay under PostgREST's max-rows cap so no page is silently truncated
+KEYSET_PAGE_SIZE = 500
+PAGE_PARAMS_ERROR = "page_size must be an integer and cursor must come from a previous response"
+
+def unique_ids(values):
+    """Return values without duplicates or empty entries, keeping first-seen order."""
+    return list(dict.fromkeys(v for v in values if v is not None))
+
+def chunked(values, size=IN_CHUNK_SIZE):
+    """Yield successive lists of at most size values."""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def select_in_chunks(build_query, column, values, chunk_size=IN_CHUNK_SIZE, max_workers=MAX_CHUNK_WORKERS):
+    """Run build_query().in_(column, chunk) for each chunk of values and merge the rows.
+
+    build_query must return a fresh query builder on every call (e.g.
+    lambda: supabase.table("orders").select("*")) so chunks don't share filters.
+    Chunks run concurrently on a bounded pool; rows come back in chunk order,
+    so callers that need a global ordering must sort the merged result.
+    """
+    ids = unique_ids(values)
+    if not ids:
+        return []
+
+    def run(chunk):
+        return build_query().in_(column, chunk).execute().data
+
+    chunks = list(chunked(ids, chunk_size))
+    if len(chunks) == 1:
+        return run(chunks[0])
+
+    rows = []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+        for chunk_rows in pool.map(run, chunks):
+            rows.extend(chunk_rows)
+    return rows
+
+def apply_keyset(query, cursor=None, column="created_at", desc=True):
+    """Order query by (column, id) and start after cursor, a (column_value, id) pair.
+
+    Keyset pagination keeps every page an index range scan instead of an OFFSET
+    that grows with page depth.
+    """
+    if cursor:
+        value, last_id = cursor
+        op = "lt" if desc else "gt"
+        # Quote the value so timestamps and text survive PostgREST's logic-tree syntax
+        query = query.or_(f'{column}.{op}."{value}",and({column}.eq."{value}",id.{op}.{last_id})')
+    return query.order(column, desc=desc).order("id", desc=desc)
+
+def keyset_pages(build_query, page_size=KEYSET_PAGE_SIZE, column="created_at"):
+    """Yield every row of build_query() as successive keyset pages, oldest first.
+
+    build_query must return a fresh builder selecting at least column and id.
+    Use this instead of one unbounded select(), which PostgREST cuts off at max-rows.
+    """
+    cursor = None
+    while True:
+        rows = apply_keyset(build_query(), cursor, column, desc=False).limit(page_size).execute().data
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        cursor = (rows[-1][column], rows[-1]["id"])
+
+def select_all(build_query, column="created_at"):
+    """Every row of build_query(), read in keyset pages; see keyset_pages."""
+    return [row for page in keyset_pages(build_query, column=column) for row in page]
+
+def encode_cursor(row, column="created_at"):
+    """Opaque cursor for the page after row."""
+    raw = json.dumps([row[column], row["id"]], default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(token):
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    if not token:
+        return None
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+    except Exception:
+        raise ValueError("Invalid cursor")
+    # Cursor values are spliced into an or_() filter, so refuse anything that could alter it
+    if not isinstance(value, (str, int, float)) or not isinstance(last_id, (str, int)) or '"' in str(value) or any(c in str(last_id) for c in '",()'):
+        raise ValueError("Invalid cursor")
+    return value, last_id
+
+def read_page_params(data, default_size, max_size):
+    """(page_size, cursor) from a request body, page_size clamped to 1..max_size.
+
+    Raises ValueError with a client message for a non-integer size or a bad cursor.
+    """
+    try:
+        page_size = min(max(int(data.get("page_size", default_size)), 1), max_size)
+        return page_size, decode_cursor(data.get("cursor"))
+    except (TypeError, ValueError):
+        raise ValueError(PAGE_PARAMS_ERROR)
+
+def fetch_page(query, cursor, page_size, column="created_at"):
+    """One keyset page of query, newest first, and the cursor for the next (None on the last page)."""
+    # Fetch one extra row to know whether another page follows
+    rows = apply_keyset(query, cursor, column).limit(page_size + 1).execute().data
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_cursor(rows[-1], column)
@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from utils.eventBus import add_listener
+
+# Per-retailer cache of computed dashboard payloads with stale-while-revalidate.
+# Entries are marked stale when the retailer's orders or products change (events
+# from utils.eventBus) or when they outlive MAX_AGE_SECONDS, which bounds staleness
+# for changes made through other worker processes. A stale entry is served as-is
+# while one background thread recomputes it. Each invalidation bumps the retailer's
+# generation, so a payload computed across an invalidation is stored already stale.
+
+MAX_AGE_SECONDS = int(os.getenv("RESPONSE_CACHE_MAX_AGE", "300"))
+MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+
+class _Entry:
+    __slots__ = ("value", "computed_at", "stale", "refreshing")
+
+    def __init__(self, value):
+        self.value = value
+        self.computed_at = time.time()
+        self.stale = False
+        self.refreshing = False
+
+class ResponseCache:
+    """LRU cache of payloads keyed by (endpoint, retailer_email, filters)."""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_age=MAX_AGE_SECONDS):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._generations = defaultdict(int)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(endpoint, retailer_email, **filters):
+        return (endpoint, retailer_email, tuple(sorted(filters.items())))
+
+    def get_or_compute(self, key, compute):
+        """Return (payload, computed_at) for key, computing it only on a cold miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if entry.stale or time.time() - entry.computed_at > self.max_age:
+                    if not entry.refreshing:
+                        entry.refreshing = True
+                        generation = self._generations[key[1]]
+                        threading.Thread(target=self._refresh, args=(key, compute, generation), daemon=True).start()
+                return entry.value, entry.computed_at
+            generation = self._generations[key[1]]
+
+        value = compute()
+        entry = self._store(key, value, generation)
+        return value, entry.computed_at
+
+    def _store(self, key, value, generation):
+        """Cache value computed at generation, marked stale if an invalidation happened since."""
+        entry = _Entry(value)
+        with self._lock:
+            entry.stale = self._generations[key[1]] != generation
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _refresh(self, key, compute, generation):
+        try:
+            self._store(key, compute(), generation)
+        except Exception as e:
+            print(f"Response cache refresh error: {str(e)}")
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+
+    def invalidate(self, retailer_email):
+        """Mark every cached payload of a retailer stale."""
+        with self._lock:
+            self._generations[retailer_email] += 1
+            for key, entry in self._entries.items():
+                if key[1] == retailer_email:
+                    entry.stale = True
+
+dashboard_cache = ResponseCache()
+
+def _invalidate_on_event(channel, event):
+    if channel.startswith("retailer:"):
+        dashboard_cache.invalidate(channel[len("retailer:"):])
+
+add_listener(_invalidate_on_event)
@@ -0,0 +1,50 @@
+import os
+import threading
+import time
+from config.supabaseConfig import supabase
+from utils.queryHelpers import select_in_chunks, unique_ids
+
+# Short-lived cache of retailer display profiles (full_name, email) for admin views.
+# Profiles rarely change, so a few minutes of staleness saves a query per page load.
+
+PROFILE_TTL_SECONDS = int(os.getenv("RETAILER_PROFILE_TTL", "300"))
+MAX_PROFILES = 5000
+
+_profiles = {}
+_lock = threading.Lock()
+
+def fallback_profile(retailer_email):
+    """Profile shown when a retailer row is missing or cannot be loaded."""
+    return {"full_name": retailer_email or "Unknown", "email": retailer_email or ""}
+
+def get_retailer_profiles(emails):
+    """Map each email to its retailer profile, loading cache misses in one batched query."""
+    emails = unique_ids(emails)
+    now = time.time()
+    profiles = {}
+    with _lock:
+        for email in emails:
+            cached = _profiles.get(email)
+            if cached is not None and now - cached[1] < PROFILE_TTL_SECONDS:
+                profiles[email] = cached[0]
+
+    missing = [email for email in emails if email not in profiles]
+    if missing:
+        try:
+            rows = select_in_chunks(lambda: supabase.table("retailer").select("full_name, email"), "email", missing)
+        except Exception as e:
+            # Table doesn't exist or other error - use emails as fallback
+            print(f"Warning: Could not fetch retailer info: {str(e)}")
+            rows = []
+        loaded = {row["email"]: row for row in rows}
+        with _lock:
+            if len(_profiles) + len(loaded) > MAX_PROFILES:
+                _profiles.clear()
+            for email in missing:
+                profile = loaded.get(email)
+                if profile is not None:
+                    _profiles[email] = (profile, now)
+                    profiles[email] = profile
+                else:
+                    profiles[email] = fallback_profile(email)
+    return profiles
@@ -0,0 +1,318 @@
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from config.supabaseConfig import supabase
+from utils.queryHelpers import KEYSET_PAGE_SIZE, select_in_chunks, unique_ids, chunked, keyset_pages, select_all
+
+# Daily pre-aggregates of each retailer's sales, bucketed by the day the order was
+# placed and its current delivery status. Expected tables:
+#   retailer_daily_rollups(retailer_email, day, status, orders, items, revenue)
+#       unique (retailer_email, day, status)
+#   product_daily_rollups(retailer_email, product_id, day, status, items, revenue)
+#       unique (product_id, day, status)
+#   platform_monthly_rollups(month, status, orders, amount)
+#       unique (month, status); amount sums orders.total_amount
+#   rollup_state(scope primary key, backfilled_at)
+#       one row per backfilled scope: "retailer:<email>" or "platform"
+# The rollup tables also have an id primary key, which keyset paging orders by.
+# Incremental deltas are only applied to scopes that have been backfilled from
+# history; until then they are skipped, since the backfill reads those orders anyway.
+# Rows are adjusted by read-modify-upsert under a process lock. Concurrent writers in
+# other processes can race, so the snapshot worker reconciles every RECONCILE_INTERVAL
+# seconds: reconcile_retailer_rollups() recomputes each backfilled retailer exactly
+# and rebuild_platform_rollups() does the same for the platform counters.
+
+RETAILER_ROLLUPS = "retailer_daily_rollups"
+PRODUCT_ROLLUPS = "product_daily_rollups"
+PLATFORM_ROLLUPS = "platform_monthly_rollups"
+ROLLUP_STATE = "rollup_state"
+PLATFORM_SCOPE = "platform"
+RECONCILE_INTERVAL = int(os.getenv("ROLLUP_RECONCILE_INTERVAL", "3600"))
+
+_write_lock = threading.Lock()
+_backfilled = set()
+
+def retailer_scope(retailer_email):
+    return f"retailer:{retailer_email}"
+
+def _backfilled_scopes(scopes):
+    """The subset of scopes whose rollups have been backfilled from history."""
+    scopes = unique_ids(scopes)
+    missing = [scope for scope in scopes if scope not in _backfilled]
+    if missing:
+        rows = supabase.table(ROLLUP_STATE).select("scope").in_("scope", missing).execute().data
+        # Backfill is permanent, so only positive answers are cached
+        _backfilled.update(row["scope"] for row in rows)
+    return {scope for scope in scopes if scope in _backfilled}
+
+def _mark_backfilled(scope):
+    supabase.table(ROLLUP_STATE).upsert({"scope": scope, "backfilled_at": datetime.now(timezone.utc).isoformat()}, on_conflict="scope").execute()
+    _backfilled.add(scope)
+
+def _day(created_at):
+    """Bucket key (YYYY-MM-DD) for an order timestamp."""
+    return str(created_at)[:10]
+
+def _collect_deltas(order, items, status, sign):
+    """Turn one order and its line items into retailer and product rollup deltas."""
+    retailer_deltas = defaultdict(lambda: {"orders": 0, "items": 0, "revenue": 0})
+    product_deltas = defaultdict(lambda: {"items": 0, "revenue": 0})
+    day = _day(order["created_at"])
+
+    seen_retailers = set()
+    for item in items:
+        retailer_email = item["retailer_email"]
+        retailer_key = (retailer_email, day, status)
+        if retailer_email not in seen_retailers:
+            retailer_deltas[retailer_key]["orders"] += sign
+            seen_retailers.add(retailer_email)
+        retailer_deltas[retailer_key]["items"] += sign * item.get("quantity", 0)
+        retailer_deltas[retailer_key]["revenue"] += sign * item.get("subtotal", 0)
+
+        if item.get("product_id"):
+            product_key = (retailer_email, item["product_id"], day, status)
+            product_deltas[product_key]["items"] += sign * item.get("quantity", 0)
+            product_deltas[product_key]["revenue"] += sign * item.get("subtotal", 0)
+
+    return retailer_deltas, product_deltas
+
+def _month(created_at):
+    """Bucket key (YYYY-MM) for an order timestamp."""
+    return str(created_at)[:7]
+
+def _collect_platform_delta(deltas, order, status, sign):
+    """Add one order to the platform counter deltas under status."""
+    key = (_month(order["created_at"]), status)
+    deltas[key]["orders"] += sign
+    deltas[key]["amount"] += sign * (order.get("total_amount") or 0)
+
+def _merge(target, source):
+    for key, delta in source.items():
+        for field, value in delta.items():
+            target[key][field] += value
+
+def _apply_deltas(retailer_deltas, product_deltas, platform_deltas=None):
+    """Add deltas to the stored rollup rows of backfilled scopes."""
+    with _write_lock:
+        # Checked under the lock: a rebuild holds it from its history scan until it marks
+        # the scope backfilled, so a delta is either in that scan or applied after it
+        scopes = [retailer_scope(key[0]) for key in retailer_deltas] + ([PLATFORM_SCOPE] if platform_deltas else [])
+        backfilled = _backfilled_scopes(scopes)
+        if PLATFORM_SCOPE not in backfilled:
+            platform_deltas = None
+        retailer_deltas = {key: d for key, d in retailer_deltas.items() if retailer_scope(key[0]) in backfilled}
+        product_deltas = {key: d for key, d in product_deltas.items() if retailer_scope(key[0]) in backfilled}
+
+        if platform_deltas:
+            months = unique_ids(key[0] for key in platform_deltas)
+            existing = supabase.table(PLATFORM_ROLLUPS).select("*").in_("month", months).execute().data
+            rows = {(row["month"], row["status"]): row for row in existing}
+
+            upserts = []
+            for key, delta in platform_deltas.items():
+                row = rows.get(key, {"orders": 0, "amount": 0})
+                upserts.append({
+                    "month": key[0],
+                    "status": key[1],
+                    "orders": row["orders"] + delta["orders"],
+                    "amount": round(row["amount"] + delta["amount"], 2)
+                })
+            supabase.table(PLATFORM_ROLLUPS).upsert(upserts, on_conflict="month,status").execute()
+
+        if retailer_deltas:
+            keys_by_retailer = defaultdict(set)
+            for retailer_email, day, _ in retailer_deltas:
+                keys_by_retailer[retailer_email].add(day)
+
+            rows = {}
+            for retailer_email, days in keys_by_retailer.items():
+                existing = supabase.table(RETAILER_ROLLUPS).select("*").eq("retailer_email", retailer_email).in_("day", list(days)).execute().data
+                for row in existing:
+                    rows[(row["retailer_email"], row["day"], row["status"])] = row
+
+            upserts = []
+            for key, delta in retailer_deltas.items():
+                row = rows.get(key, {"orders": 0, "items": 0, "revenue": 0})
+                upserts.append({
+                    "retailer_email": key[0],
+                    "day": key[1],
+                    "status": key[2],
+                    "orders": row["orders"] + delta["orders"],
+                    "items": row["items"] + delta["items"],
+                    "revenue": round(row["revenue"] + delta["revenue"], 2)
+                })
+            supabase.table(RETAILER_ROLLUPS).upsert(upserts, on_conflict="retailer_email,day,status").execute()
+
+        if product_deltas:
+            product_ids = unique_ids(key[1] for key in product_deltas)
+            days = unique_ids(key[2] for key in product_deltas)
+            existing = select_in_chunks(lambda: supabase.table(PRODUCT_ROLLUPS).select("*").in_("day", days), "product_id", product_ids)
+            rows = {(row["product_id"], row["day"], row["status"]): row for row in existing}
+
+            upserts = []
+            for key, delta in product_deltas.items():
+                row = rows.get((key[1], key[2], key[3]), {"items": 0, "revenue": 0})
+                upserts.append({
+                    "retailer_email": key[0],
+                    "product_id": key[1],
+                    "day": key[2],
+                    "status": key[3],
+                    "items": row["items"] + delta["items"],
+                    "revenue": round(row["revenue"] + delta["revenue"], 2)
+                })
+            supabase.table(PRODUCT_ROLLUPS).upsert(upserts, on_conflict="product_id,day,status").execute()
+
+def record_order_placed(order, order_items):
+    """Count a newly placed order in its retailers' rollups and the platform counters."""
+    try:
+        status = order.get("delivery_status", "pending")
+        retailer_deltas, product_deltas = _collect_deltas(order, order_items, status, 1)
+        platform_deltas = defaultdict(lambda: {"orders": 0, "amount": 0})
+        _collect_platform_delta(platform_deltas, order, status, 1)
+        _apply_deltas(retailer_deltas, product_deltas, platform_deltas)
+    except Exception as e:
+        print(f"Rollup update error (order placed): {str(e)}")
+
+def snapshot_orders(order_ids):
+    """Capture orders and their line items before a status change.
+
+    Pass the result to record_status_change() once the update has succeeded.
+    """
+    order_ids = unique_ids(order_ids)
+    if not order_ids:
+        return []
+    try:
+        orders = select_in_chunks(lambda: supabase.table("orders").select("id, delivery_status, created_at, total_amount"), "id", order_ids)
+        items = select_in_chunks(lambda: supabase.table("order_items").select("order_id, product_id, retailer_email, quantity, subtotal"), "order_id", order_ids)
+    except Exception as e:
+        print(f"Rollup snapshot error: {str(e)}")
+        return []
+
+    items_by_order = defaultdict(list)
+    for item in items:
+        items_by_order[item["order_id"]].append(item)
+    return [(order, items_by_order.get(order["id"], [])) for order in orders]
+
+def record_status_change(snapshot, new_status):
+    """Move snapshotted orders from their previous status bucket to new_status."""
+    try:
+        retailer_deltas = defaultdict(lambda: {"orders": 0, "items": 0, "revenue": 0})
+        product_deltas = defaultdict(lambda: {"items": 0, "revenue": 0})
+        platform_deltas = defaultdict(lambda: {"orders": 0, "amount": 0})
+        for order, items in snapshot:
+            old_status = order.get("delivery_status")
+            if old_status == new_status:
+                continue
+            for status, sign in ((old_status, -1), (new_status, 1)):
+                order_retailer_deltas, order_product_deltas = _collect_deltas(order, items, status, sign)
+                _merge(retailer_deltas, order_retailer_deltas)
+                _merge(product_deltas, order_product_deltas)
+                _collect_platform_delta(platform_deltas, order, status, sign)
+        _apply_deltas(retailer_deltas, product_deltas, platform_deltas)
+    except Exception as e:
+        print(f"Rollup update error (status change): {str(e)}")
+
+def rebuild_retailer_rollups(retailer_email):
+    """Recompute a retailer's rollups from order history, replace the stored rows and mark it backfilled.
+
+    Like the platform rebuild, the scan runs under the write lock so no delta from
+    this process falls between reading history and replacing the rows.
+    """
+    retailer_deltas = defaultdict(lambda: {"orders": 0, "items": 0, "revenue": 0})
+    product_deltas = defaultdict(lambda: {"items": 0, "revenue": 0})
+    with _write_lock:
+        # The inner embed keeps only this retailer's orders and, per order, only its items
+        pages = keyset_pages(lambda: supabase.table("orders").select(
+            "id, delivery_status, created_at, order_items!inner(order_id, product_id, retailer_email, quantity, subtotal)"
+        ).eq("order_items.retailer_email", retailer_email))
+        for orders in pages:
+            for order in orders:
+                order_retailer_deltas, order_product_deltas = _collect_deltas(order, order["order_items"], order.get("delivery_status"), 1)
+                _merge(retailer_deltas, order_retailer_deltas)
+                _merge(product_deltas, order_product_deltas)
+
+        retailer_rows = [
+            {"retailer_email": key[0], "day": key[1], "status": key[2], "orders": d["orders"], "items": d["items"], "revenue": round(d["revenue"], 2)}
+            for key, d in retailer_deltas.items()
+        ]
+        product_rows = [
+            {"retailer_email": key[0], "product_id": key[1], "day": key[2], "status": key[3], "items": d["items"], "revenue": round(d["revenue"], 2)}
+            for key, d in product_deltas.items()
+        ]
+
+        supabase.table(RETAILER_ROLLUPS).delete().eq("retailer_email", retailer_email).execute()
+        supabase.table(PRODUCT_ROLLUPS).delete().eq("retailer_email", retailer_email).execute()
+        for chunk in chunked(retailer_rows, 500):
+            supabase.table(RETAILER_ROLLUPS).insert(chunk).execute()
+        for chunk in chunked(product_rows, 500):
+            supabase.table(PRODUCT_ROLLUPS).insert(chunk).execute()
+        _mark_backfilled(retailer_scope(retailer_email))
+    return retailer_rows
+
+def _backfilled_retailers():
+    """Emails of every backfilled retailer, read in keyset pages over the scope key."""
+    prefix = retailer_scope("")
+    last_scope = None
+    while True:
+        query = supabase.table(ROLLUP_STATE).select("scope").like("scope", f"{prefix}%")
+        if last_scope is not None:
+            query = query.gt("scope", last_scope)
+        rows = query.order("scope").limit(KEYSET_PAGE_SIZE).execute().data
+        for row in rows:
+            yield row["scope"][len(prefix):]
+        if len(rows) < KEYSET_PAGE_SIZE:
+            return
+        last_scope = rows[-1]["scope"]
+
+def reconcile_retailer_rollups():
+    """Rebuild every backfilled retailer, repairing drift from cross-process races."""
+    for retailer_email in list(_backfilled_retailers()):
+        try:
+            rebuild_retailer_rollups(retailer_email)
+        except Exception as e:
+            print(f"Rollup reconcile error ({retailer_email}): {str(e)}")
+
+def load_retailer_rollups(retailer_email):
+    """Return a retailer's daily rollup rows, backfilling them from history on first use."""
+    if not _backfilled_scopes([retailer_scope(retailer_email)]):
+        return rebuild_retailer_rollups(retailer_email)
+    return select_all(lambda: supabase.table(RETAILER_ROLLUPS).select("id, day, status, orders, items, revenue").eq("retailer_email", retailer_email), column="day")
+
+def load_product_rollups(retailer_email):
+    """Return a retailer's per-product daily rollup rows."""
+    return select_all(lambda: supabase.table(PRODUCT_ROLLUPS).select("id, product_id, day, status, items, revenue").eq("retailer_email", retailer_email), column="day")
+
+def rebuild_platform_rollups():
+    """Recompute the platform counters from every order and overwrite the stored rows.
+
+    The scan runs under the write lock so no delta from this process lands between
+    reading an order and overwriting its counter. Counters that no longer match any
+    order are zeroed rather than deleted so readers never see a partially rebuilt table.
+    """
+    deltas = defaultdict(lambda: {"orders": 0, "amount": 0})
+    with _write_lock:
+        pages = keyset_pages(lambda: supabase.table("orders").select("id, delivery_status, created_at, total_amount"))
+        for orders in pages:
+            for order in orders:
+                _collect_platform_delta(deltas, order, order.get("delivery_status"), 1)
+
+        existing = supabase.table(PLATFORM_ROLLUPS).select("month, status").execute().data
+        for row in existing:
+            key = (row["month"], row["status"])
+            if key not in deltas:
+                deltas[key] = {"orders": 0, "amount": 0}
+        rows = [
+            {"month": key[0], "status": key[1], "orders": d["orders"], "amount": round(d["amount"], 2)}
+            for key, d in deltas.items()
+        ]
+        for chunk in chunked(rows, 500):
+            supabase.table(PLATFORM_ROLLUPS).upsert(chunk, on_conflict="month,status").execute()
+        _mark_backfilled(PLATFORM_SCOPE)
+    return rows
+
+def load_platform_rollups():
+    """Return the platform's monthly counter rows, backfilling them on first use."""
+    if not _backfilled_scopes([PLATFORM_SCOPE]):
+        return rebuild_platform_rollups()
+    return select_all(lambda: supabase.table(PLATFORM_ROLLUPS).select("id, month, status, orders, amount"), column="month")
@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+from config.supabaseConfig import supabase
+from utils.eventBus import add_listener
+from utils.queryHelpers import keyset_pages
+
+# Background precomputation of heavy analytics. Controllers register a compute
+# function per snapshot kind; a daemon thread recomputes every kind for every
+# retailer (or once platform-wide) each SNAPSHOT_INTERVAL seconds and keeps the
+# latest result with its computed_at time. Maintenance jobs registered with
+# register_job() run from the same thread at their own interval. Set
+# ANALYTICS_SNAPSHOT_INTERVAL=0 to disable the worker.
+# The worker starts in every server process. With several processes (e.g. gunicorn
+# workers), set ANALYTICS_SNAPSHOT_WORKER=false in all but one of them: the others
+# then only run per-process jobs (which refresh their own in-memory state) and
+# compute analytics live instead of each rescanning every retailer and rebuilding
+# the shared rollups.
+
+SNAPSHOT_INTERVAL = int(os.getenv("ANALYTICS_SNAPSHOT_INTERVAL", "600"))
+SNAPSHOT_WORKER = os.getenv("ANALYTICS_SNAPSHOT_WORKER", "true").lower() != "false"
+
+_jobs = {}
+_maintenance = {}
+_snapshots = {}
+_lock = threading.Lock()
+_worker = None
+
+def register_snapshot(kind, compute, per_retailer=True):
+    """Register compute(retailer_email) (or compute() when platform-wide) under kind."""
+    _jobs[kind] = (compute, per_retailer)
+
+def register_job(name, run, interval, per_process=False):
+    """Run run() from the worker at most once every interval seconds.
+
+    per_process jobs maintain this process's own state and run in every process;
+    the rest only run where ANALYTICS_SNAPSHOT_WORKER is enabled.
+    """
+    _maintenance[name] = {"run": run, "interval": interval, "last_run": 0, "per_process": per_process}
+
+def get_snapshot(kind, retailer_email=None):
+    """Latest snapshot as {"data", "computed_at"}, or None if there isn't one."""
+    with _lock:
+        return _snapshots.get((kind, retailer_email))
+
+def store_snapshot(kind, retailer_email, data):
+    snapshot = {"data": data, "computed_at": time.time()}
+    with _lock:
+        _snapshots[(kind, retailer_email)] = snapshot
+    return snapshot
+
+def refresh_snapshot(kind, retailer_email=None):
+    """Recompute one snapshot now and store it."""
+    compute, per_retailer = _jobs[kind]
+    data = compute(retailer_email) if per_retailer else compute()
+    return store_snapshot(kind, retailer_email, data)
+
+def wants_fresh(data):
+    """True when a request body asks to bypass snapshots with fresh=true."""
+    fresh = data.get("fresh")
+    return fresh is True or str(fresh).lower() == "true"
+
+def snapshot_or_compute(kind, retailer_email=None, fresh=False, fallback=None):
+    """Return (payload, computed_at) for kind, preferring the latest snapshot.
+
+    fresh recomputes synchronously and replaces the snapshot. Without a snapshot,
+    fallback() (which must return (payload, computed_at)) is used if given, else
+    the snapshot is computed now.
+    """
+    if not fresh:
+        snapshot = get_snapshot(kind, retailer_email)
+        if snapshot is not None:
+            return snapshot["data"], snapshot["computed_at"]
+        if fallback is not None:
+            return fallback()
+    snapshot = refresh_snapshot(kind, retailer_email)
+    return snapshot["data"], snapshot["computed_at"]
+
+def _drop_retailer_snapshots(channel, event):
+    # A retailer's snapshots are superseded by live (cached) computation once their data
+    # changes; platform-wide snapshots are kept until the next cycle, since dropping them
+    # on every retailer event would recompute them on nearly every admin request
+    if channel.startswith("retailer:"):
+        retailer_email = channel[len("retailer:"):]
+        with _lock:
+            for key in [k for k in _snapshots if k[1] == retailer_email]:
+                del _snapshots[key]
+
+add_listener(_drop_retailer_snapshots)
+
+def run_due_jobs(shared=True):
+    """Run the maintenance jobs whose interval has elapsed; shared=False runs only per-process jobs."""
+    for name, job in list(_maintenance.items()):
+        if not (shared or job["per_process"]) or time.time() - job["last_run"] < job["interval"]:
+            continue
+        job["last_run"] = time.time()
+        try:
+            job["run"]()
+        except Exception as e:
+            print(f"Maintenance job error ({name}): {str(e)}")
+
+def run_snapshot_cycle():
+    """Recompute every registered snapshot once."""
+    per_retailer_kinds = [kind for kind, (_, per_retailer) in _jobs.items() if per_retailer]
+    for kind, (_, per_retailer) in list(_jobs.items()):
+        if not per_retailer:
+            try:
+                refresh_snapshot(kind)
+            except Exception as e:
+                print(f"Snapshot error ({kind}): {str(e)}")
+
+    if not per_retailer_kinds:
+        return
+    for retailers in keyset_pages(lambda: supabase.table("retailer").select("id, email"), column="id"):
+        for retailer in retailers:
+            for kind in per_retailer_kinds:
+                try:
+                    refresh_snapshot(kind, retailer["email"])
+                except Exception as e:
+                    print(f"Snapshot error ({kind}, {retailer['email']}): {str(e)}")
+
+def _run_forever():
+    while True:
+        started = time.time()
+        try:
+            run_due_jobs(shared=SNAPSHOT_WORKER)
+            if SNAPSHOT_WORKER:
+                run_snapshot_cycle()
+        except Exception as e:
+            print(f"Snapshot worker error: {str(e)}")
+        time.sleep(max(SNAPSHOT_INTERVAL - (time.time() - started), 1))
+
+def start_snapshot_worker():
+    """Start the background worker once per process."""
+    global _worker
+    if SNAPSHOT_INTERVAL <= 0 or supabase is None:
+        return
+    with _lock:
+        if _worker is not None:
+            return
+        _worker = threading.Thread(target=_run_forever, name="analytics-snapshots", daemon=True)
+        _worker.start()
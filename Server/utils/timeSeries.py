@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import numpy as np
+from utils.analyticsEngine import OrderFrame, as_datetime64
+
+# Revenue/order-count series over arbitrary ranges, bucketed by hour, day, week or
+# month in the caller's timezone. Bucket edges are computed in local wall time (so
+# DST days and month lengths are right), converted to UTC once, and every order is
+# assigned to its bucket with a single searchsorted over the edge array.
+# When every bucket is a whole number of UTC days or months and the range runs up to
+# now, rollup_series() gives the same result from the daily/monthly rollup rows.
+
+GRANULARITIES = ("hour", "day", "week", "month")
+MAX_BUCKETS = 1000
+DEFAULT_RANGE_DAYS = {"hour": 2, "day": 30, "week": 182, "month": 365}
+# Granularities that a rollup keyed by UTC day or month can be summed into
+ROLLUP_GRANULARITIES = {"day": ("day", "week", "month"), "month": ("month",)}
+
+def _parse_datetime(value, tz):
+    if not isinstance(value, str):
+        raise TypeError("timestamp must be a string")
+    date = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return date if date.tzinfo else date.replace(tzinfo=tz)
+
+def parse_series_params(data):
+    """Validate series filters from a request body; raises ValueError with a client message."""
+    granularity = data.get("granularity", "day")
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+
+    try:
+        tz = ZoneInfo(data.get("timezone") or "UTC")
+    except (ZoneInfoNotFoundError, TypeError, ValueError):
+        raise ValueError("timezone must be an IANA name such as Asia/Karachi")
+
+    try:
+        end = _parse_datetime(data["date_to"], tz) if data.get("date_to") else datetime.now(timezone.utc)
+        if data.get("date_from"):
+            start = _parse_datetime(data["date_from"], tz)
+        else:
+            # Default ranges start on a bucket boundary so the first bucket is whole
+            start = _floor((end - timedelta(days=DEFAULT_RANGE_DAYS[granularity])).astimezone(tz), granularity)
+    except (TypeError, ValueError):
+        raise ValueError("date_from and date_to must be ISO 8601 timestamps")
+    if start >= end:
+        raise ValueError("date_from must be before date_to")
+
+    edges = bucket_edges(start, end, granularity, tz)
+    if len(edges) - 1 > MAX_BUCKETS:
+        raise ValueError(f"Range too large: at most {MAX_BUCKETS} {granularity} buckets per request")
+
+    return {"granularity": granularity, "tz": tz, "start": start, "end": end, "edges": edges, "open_ended": not data.get("date_to")}
+
+def _floor(local, granularity):
+    if granularity == "hour":
+        return local.replace(minute=0, second=0, microsecond=0)
+    day = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+def _step(local, granularity):
+    if granularity == "day":
+        return local + timedelta(days=1)
+    if granularity == "week":
+        return local + timedelta(weeks=1)
+    if local.month == 12:
+        return local.replace(year=local.year + 1, month=1)
+    return local.replace(month=local.month + 1)
+
+def bucket_edges(start, end, granularity, tz):
+    """Aware UTC datetimes bounding consecutive buckets that cover [start, end]."""
+    local = _floor(start.astimezone(tz), granularity)
+    end_utc = end.astimezone(timezone.utc)
+    edges = [local.astimezone(timezone.utc)]
+    while edges[-1] <= end_utc and len(edges) <= MAX_BUCKETS + 1:
+        if granularity == "hour":
+            # Hours step in absolute time so DST transitions neither repeat nor skip buckets
+            edges.append(edges[-1] + timedelta(hours=1))
+        else:
+            local = _step(local, granularity)
+            # Re-attach the zone to the naive wall time to pick up DST offset changes
+            edges.append(local.replace(tzinfo=None).replace(tzinfo=tz).astimezone(timezone.utc))
+    return edges
+
+def _series_rows(edges, tz, counts, revenue):
+    return [
+        {
+            "bucket_start": edges[i].astimezone(tz).isoformat(),
+            "orders": int(counts[i]),
+            "revenue": round(float(revenue[i]), 2)
+        }
+        for i in range(len(edges) - 1)
+    ]
+
+def build_series(orders, order_items, params, status=None):
+    """Order counts and revenue per bucket for the given params.
+
+    status limits the series to one delivery status; order_items=None takes each
+    order's total_amount as its revenue.
+    """
+    frame = OrderFrame(orders, order_items)
+    edges = params["edges"]
+    edge_array = np.array([as_datetime64(edge) for edge in edges], dtype="datetime64[s]")
+
+    mask = ~np.isnat(frame.created_at)
+    if status:
+        mask &= frame.status_mask(status)
+    mask &= (frame.created_at >= as_datetime64(params["start"])) & (frame.created_at <= as_datetime64(params["end"]))
+
+    bucket_count = len(edges) - 1
+    positions = np.searchsorted(edge_array, frame.created_at[mask], side="right") - 1
+    valid = (positions >= 0) & (positions < bucket_count)
+    counts = np.bincount(positions[valid], minlength=bucket_count)
+    revenue = np.bincount(positions[valid], weights=frame.revenue[mask][valid], minlength=bucket_count)
+    return _series_rows(edges, params["tz"], counts, revenue)
+
+def rollups_cover(params, period):
+    """True when rollup rows keyed by UTC period ("day" or "month") give the exact series.
+
+    Every bucket must be whole periods: the zone is at UTC offset 0 throughout, the
+    range starts on a bucket edge, and it runs up to now so the last bucket is not cut.
+    """
+    edges = params["edges"]
+    return (
+        params["granularity"] in ROLLUP_GRANULARITIES[period]
+        and params["open_ended"]
+        and params["start"] == edges[0]
+        and not any(edge.astimezone(params["tz"]).utcoffset() for edge in edges)
+    )
+
+def rollup_series(rows, params, period, amount="revenue", status=None):
+    """Series from rollup rows with period ("day" or "month"), status, orders and amount keys."""
+    if status:
+        rows = [row for row in rows if (row.get("status") or "").lower() == status.lower()]
+    edges = params["edges"]
+    bucket_count = len(edges) - 1
+    edge_array = np.array([as_datetime64(edge) for edge in edges], dtype="datetime64[s]")
+    starts = np.array([row[period] for row in rows], dtype="datetime64[s]")
+
+    positions = np.searchsorted(edge_array, starts, side="right") - 1
+    valid = (positions >= 0) & (positions < bucket_count)
+    orders = np.array([row.get("orders") or 0 for row in rows], dtype=np.float64)
+    amounts = np.array([row.get(amount) or 0 for row in rows], dtype=np.float64)
+    counts = np.bincount(positions[valid], weights=orders[valid], minlength=bucket_count)
+    revenue = np.bincount(positions[valid], weights=amounts[valid], minlength=bucket_count)
+    return _series_rows(edges, params["tz"], counts, revenue)
@@ -33,6 +33,9 @@ interface Order {
 export class Orders implements OnInit {
   orders: Order[] = [];
   isLoading = true;
+  // Cursor for the next page of orders; null once every page is loaded
+  nextCursor: string | null = null;
+  isLoadingMore = false;
   selectedOrder: Order | null = null;
   showOrderModal = false;
   showRejectModal = false;
@@ -84,6 +87,7 @@ export class Orders implements OnInit {
     this.apiService.post('retailer/view-orders', { auth_token: authToken }).subscribe({
       next: (response) => {
         this.orders = response.orders || [];
+        this.nextCursor = response.next_cursor || null;
         this.isLoading = false;
       },
       error: (err) => {
@@ -93,6 +97,24 @@ export class Orders implements OnInit {
     });
   }
 
+  loadMoreOrders() {
+    const authToken = localStorage.getItem('auth_token');
+    if (!authToken || !this.nextCursor || this.isLoadingMore) return;
+
+    this.isLoadingMore = true;
+    this.apiService.post('retailer/view-orders', { auth_token: authToken, cursor: this.nextCursor }).subscribe({
+      next: (response) => {
+        this.orders = [...this.orders, ...(response.orders || [])];
+        this.nextCursor = response.next_cursor || null;
+        this.isLoadingMore = false;
+      },
+      error: (err) => {
+        console.error('Failed to load more orders:', err);
+        this.isLoadingMore = false;
+      }
+    });
+  }
+
   // Order Management
   async confirmOrder(order: Order) {
     if (!confirm(`Are you sure you want to confirm order #${order.id}?`)) return;